@@ -1,12 +1,14 @@
 # Imports
 import streamlit as st
 from videopluxtext.translate import TranslateMassage as Translator
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
-import tempfile
-from io import BytesIO
-import textwrap
-import asyncio
+from videopluxtext.translation_service import BackgroundTranslationService
+from videopluxtext.jobs import JobStore, RenderJobQueue
+from videopluxtext.uploads import UploadManager
+from videopluxtext.media_server import MediaServer
+from videopluxtext.preview import PreviewRenderer
+from tracing import tracer
 import os
+import uuid
 
 # Set Streamlit template directory
 template_dir = "temp_video"  # Replace with your actual path
@@ -15,40 +17,213 @@ if not os.path.exists(template_dir):
     os.makedirs(template_dir)
 os.environ["STREAMLIT_STATIC_PATH"] = template_dir
 
+# One upload manager for the whole server, shared by every session
+@st.cache_resource
+def get_upload_manager():
+    manager = UploadManager(root=os.path.join(template_dir, "uploads"))
+    manager.cleanup()
+    return manager
+
+# Finished renders live here and are streamed to the browser straight from disk
+render_dir = os.path.join(template_dir, "renders")
+render_retention_seconds = int(os.getenv("RENDER_RETENTION_SECONDS", str(24 * 3600)))
+render_retention_bytes = int(os.getenv("RENDER_RETENTION_BYTES", str(20 * 1024 ** 3)))
+
+@st.cache_resource
+def get_media_server():
+    return MediaServer(
+        render_dir,
+        host=os.getenv("MEDIA_SERVER_HOST", "127.0.0.1"),
+        port=int(os.getenv("MEDIA_SERVER_PORT", "8502")),
+        public_url=os.getenv("MEDIA_SERVER_PUBLIC_URL"),
+    ).start()
+
+# Proxy previews are cheap to recreate, so they are kept for an hour at most
+preview_dir = os.path.join(template_dir, "previews")
+
+@st.cache_resource
+def get_preview_renderer():
+    return PreviewRenderer(
+        preview_dir, max_width=int(os.getenv("PREVIEW_MAX_WIDTH", "480")), max_age_seconds=3600,
+        max_total_bytes=256 * 1024 ** 2,
+    )
+
+font_map = {
+    "Hindi": r"fonts\\DevanagariSangamMN.ttc",
+    "Bengali": r"fonts\\NotoSerifBengali-VariableFont_wdth,wght.ttf",
+    "Tamil": r"fonts\\NotoSansTamil-VariableFont_wdth,wght.ttf",
+    "Telugu": r"fonts\\NotoSansTelugu-VariableFont_wdth,wght.ttf",
+    "Gujarati": r"fonts\\NotoSansGujarati-VariableFont_wdth,wght.ttf",
+    "Marathi": r"fonts\\TiroDevanagariMarathi-Regular.ttf",
+    "Maithili": r"fonts\\DevanagariSangamMN.ttc",
+    "Malayalam": r"fonts\\NotoSansMalayalam-VariableFont_wdth,wght.ttf",
+    "English": r"fonts\\NotoSans-VariableFont_wdth,wght.ttf"
+}
+
+job_dir = os.path.join(template_dir, "jobs")
+job_poll_seconds = float(os.getenv("RENDER_JOB_POLL_SECONDS", "2"))
+
+# Built once per server process; the model starts loading in the background right away
+@st.cache_resource
+def get_full_process():
+    full_process = FullProcess()
+    full_process.translator.warm_up()
+    return full_process
+
 # Class Definition
 class FullProcess:
     def __init__(self):
         self.translator = Translator()
-        self._pipeline_initialized = False
+        # Shared by every session, so concurrent "Process Video" clicks are batched into the same generate calls
+        self.translation_service = BackgroundTranslationService(self.translator)
+        # Renders run here, off the script thread, and their state survives reruns and restarts
+        self.job_queue = RenderJobQueue(
+            JobStore(os.path.join(job_dir, "jobs.sqlite3")),
+            self.translation_service.translate_many_blocking,
+            font_map,
+            render_dir,
+            source_dir=os.path.join(job_dir, "sources"),
+            workers=int(os.getenv("RENDER_JOB_WORKERS", "1")),
+        )
+        self.job_queue.prune_outputs(render_retention_seconds, render_retention_bytes)
+
+    def show_jobs(self, owner):
+        # Polled on its own, so progress updates without rerunning the rest of the page
+        @st.fragment(run_every=job_poll_seconds)
+        def jobs_panel():
+            jobs = self.job_queue.store.list(owner)
+            if not jobs:
+                return
+            media_server = get_media_server()
+
+            st.header("Render Jobs")
+            for job in jobs:
+                variant_count = len(job["request"]["language_tuples"])
+                st.subheader(f"Job {job['id'][:8]}: {job['status']}")
+                if job["status"] == "queued":
+                    st.caption("Waiting for a render worker...")
+                elif job["stage"] == "translating":
+                    st.caption("Translating overlay text...")
+                elif job["stage"] == "rendering":
+                    fraction = job["frames_done"] / job["frames_total"] if job["frames_total"] else 0.0
+                    st.progress(
+                        min(fraction, 1.0),
+                        text=f"Rendering: {job['frames_done']}/{job['frames_total']} frames, "
+                        f"{len(job['outputs'])}/{variant_count} variants done",
+                    )
+                elif job["status"] == "failed":
+                    st.error(f"An error occurred: {job['error']}")
+
+                for output in job["outputs"]:
+                    st.success(f"Video processed for languages: {output['langs']}")
+                    if not os.path.exists(output["output_path"]):
+                        st.caption("This render has expired and was removed from the server.")
+                        continue
+
+                    # The player and the download both fetch ranges from disk, nothing is held in memory
+                    st.video(media_server.url_for(output["output_path"]), format="video/mp4")
+                    st.link_button(
+                        "Download Processed Video",
+                        media_server.url_for(output["output_path"], download=True),
+                    )
 
-    def initialize_pipeline(self):
-        if not self._pipeline_initialized:
-            asyncio.run(self.translator.load_pipline())
-            self._pipeline_initialized = True
+        jobs_panel()
+
+    def show_preview(self, video_path, overlay_data, language_tuples):
+        st.header("Preview")
+        st.caption("Low-resolution proxy of the layout; nothing is translated or fully rendered until you process the video.")
+
+        # The source text stands in for any translation that is not cached yet
+        tuples = language_tuples or [("English",) * len(overlay_data)]
+        langs = st.selectbox(
+            "Preview Languages", tuples, format_func=lambda langs: ", ".join(langs), key="preview_langs"
+        )
+        preview_mode = st.radio("Preview Mode", ["Frames", "Clip"], horizontal=True, key="preview_mode")
+
+        overlays = []
+        for idx, overlay in enumerate(overlay_data):
+            lang = langs[idx] if idx < len(langs) else langs[-1]
+            translated = self.translator.cached_translation(overlay["text"], lang)
+            overlays.append({**overlay, "text": translated or overlay["text"], "font": font_map.get(lang)})
+
+        preview_renderer = get_preview_renderer()
+        try:
+            # One preview per overlay, at the moment it appears
+            cols = st.columns(min(len(overlays), 3))
+            for idx, overlay in enumerate(overlays):
+                with cols[idx % len(cols)]:
+                    if preview_mode == "Frames":
+                        st.image(
+                            preview_renderer.preview_frame(video_path, overlays, overlay["start_time"]),
+                            caption=f"Text {idx + 1} at {overlay['start_time']:.0f}s",
+                        )
+                    else:
+                        st.video(preview_renderer.preview_clip(video_path, overlays, overlay["start_time"]))
+        except Exception as e:
+            st.error(f"Preview failed: {e}")
+
+    def show_diagnostics(self):
+        # Stage timings from this server process, with render workers' stages folded in as their groups finish
+        with st.sidebar.expander("Diagnostics"):
+            rows, counters = tracer.summary()
+            if rows:
+                st.dataframe(rows, hide_index=True)
+            else:
+                st.caption("No stages recorded yet.")
+            if counters:
+                st.json(counters)
+            if st.button("Reset Diagnostics"):
+                tracer.reset()
 
     def main(self):
         st.title("Video Overlay App")
         st.write("Upload a video and add multiple text overlays in multiple languages!")
 
-        # Function to get video duration
-        def get_video_duration(uploaded_file):
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                # Write the uploaded file to the temporary file
-                temp_file.write(uploaded_file.getbuffer())
-                temp_file_path = temp_file.name
-            
-            # Load video and get duration
-            video = VideoFileClip(temp_file_path)
-            duration = video.duration  # Duration in seconds
-            return duration
+        model_stats = self.translator.model_stats()
+        if model_stats:
+            st.sidebar.caption(
+                f"Translation model loaded in {model_stats['load_seconds']:.1f}s, "
+                f"{model_stats['model_rss_mb']:.0f} MB resident (process {model_stats['process_rss_mb']:.0f} MB)"
+            )
+        else:
+            st.sidebar.caption("Translation model is loading in the background...")
+
+        service_metrics = self.translation_service.metrics()
+        st.sidebar.caption(
+            f"Translation queue: {service_metrics['queue_depth']} waiting, "
+            f"{service_metrics['batches']} batches, mean batch size {service_metrics['mean_batch_size']:.1f}"
+        )
+
+        self.show_diagnostics()
+
+        upload_manager = get_upload_manager()
+
+        # Every browser session holds a reference on the upload it is editing; the id rides in the URL
+        # so a refreshed tab finds its render jobs again
+        if "session_owner" not in st.session_state:
+            st.session_state.session_owner = st.query_params.get("session") or uuid.uuid4().hex
+            st.query_params["session"] = st.session_state.session_owner
+        owner = st.session_state.session_owner
 
         # File uploader for video
         uploaded_file = st.file_uploader("Choose a video", type=["mp4", "mov", "avi"])
 
+        # Drop the previous spool as soon as the upload is replaced or cleared
+        previous_digest = st.session_state.get("upload_digest")
+        current_digest = None
         if uploaded_file is not None:
-            # Get video duration
-            duration = get_video_duration(uploaded_file)
+            current_digest, video_path = upload_manager.spool(uploaded_file)
+            upload_manager.acquire(current_digest, owner)
+            st.session_state.upload_digest = current_digest
+        elif "upload_digest" in st.session_state:
+            del st.session_state.upload_digest
+        if previous_digest and previous_digest != current_digest:
+            upload_manager.release(previous_digest, owner)
+
+        if uploaded_file is not None:
+            # Header-only probe, memoized per upload
+            metadata = upload_manager.metadata(current_digest)
+            duration = metadata["duration"]
             st.write(f"Video Duration: {duration} seconds")
 
             # Initialize session state for text-caption pairs
@@ -144,71 +319,40 @@ class FullProcess:
             # Pass the 'duration' to the function when calling it
             overlay_data = [get_text_overlay_input(i, duration) for i in range(1, num_combo + 1)]
 
+            self.show_preview(video_path, overlay_data, st.session_state.text_caption_pairs)
+
             # Section 4: Process Video
+            output_mode = st.selectbox(
+                "Output Mode",
+                ["full", "overlay-only"],
+                format_func=lambda mode: "Full re-encode" if mode == "full" else "Overlay-only (re-encode overlay segments)",
+                key="output_mode",
+            )
+            render_backend = st.selectbox(
+                "Render Backend",
+                ["moviepy", "ffmpeg"],
+                format_func=lambda backend: "MoviePy compositing" if backend == "moviepy" else "FFmpeg filter graph",
+                key="render_backend",
+                disabled=output_mode != "full",
+            )
+
             if st.button("Process Video"):
                 if uploaded_file and overlay_data and st.session_state.text_caption_pairs:
                     try:
-                        self.initialize_pipeline()
-
-                        with tempfile.NamedTemporaryFile(delete=False, dir=template_dir, suffix=".mp4") as temp_file:
-                            temp_file.write(uploaded_file.read())
-                            temp_file_path = temp_file.name
-
-                        video = VideoFileClip(temp_file_path)
-
-                        font_map = {
-                            "Hindi": r"fonts\\DevanagariSangamMN.ttc",
-                            "Bengali": r"fonts\\NotoSerifBengali-VariableFont_wdth,wght.ttf",
-                            "Tamil": r"fonts\\NotoSansTamil-VariableFont_wdth,wght.ttf",
-                            "Telugu": r"fonts\\NotoSansTelugu-VariableFont_wdth,wght.ttf",
-                            "Gujarati": r"fonts\\NotoSansGujarati-VariableFont_wdth,wght.ttf",
-                            "Marathi": r"fonts\\TiroDevanagariMarathi-Regular.ttf",
-                            "Maithili": r"fonts\\DevanagariSangamMN.ttc",
-                            "Malayalam": r"fonts\\NotoSansMalayalam-VariableFont_wdth,wght.ttf",
-                            "English": r"fonts\\NotoSans-VariableFont_wdth,wght.ttf"
-                        }
-
-                        for langs in st.session_state.text_caption_pairs:
-                            overlays = []
-                            for idx, lang in enumerate(langs):
-                                overlay = overlay_data[idx]
-                                translated_text = self.translator.translate_input(overlay["text"], lang)[0].get("translation_text")
-                                wrapped_text = "\n".join(textwrap.wrap(translated_text, width=70))
-                                text_clip = (
-                                    TextClip(wrapped_text, font_size=overlay["font_size"], color=overlay["color"], font=font_map.get(lang))
-                                    .with_position((overlay["relative_x"], overlay["relative_y"]), relative=True)
-                                    .with_start(overlay["start_time"])
-                                    .with_duration(overlay["duration"])
-                                )
-                                overlays.append(text_clip)
-
-                            final_video = CompositeVideoClip([video, *overlays])
-
-                            output_buffer = BytesIO()
-                            processed_video_path = temp_file_path.replace(
-                                ".mp4", f"_processed_{'_'.join(langs)}.mp4"
-                            )
-                            final_video.write_videofile(processed_video_path, codec="libx264", audio_codec="aac", fps=24)
-
-                            with open(processed_video_path, "rb") as f:
-                                output_buffer.write(f.read())
-                            output_buffer.seek(0)
-
-                            st.success(f"Video processed for languages: {langs}")
-                            st.video(output_buffer, format="video/mp4")
-
-                            with open(processed_video_path, "rb") as f:
-                                st.download_button(
-                                    label="Download Processed Video",
-                                    data=f,
-                                    file_name=f"processed_video_{'_'.join(langs)}.mp4",
-                                    mime="video/mp4"
-                                )
+                        self.job_queue.prune_outputs(render_retention_seconds, render_retention_bytes)
+                        # Translation and rendering happen in the job queue; this run returns right away
+                        job_id = self.job_queue.submit(
+                            owner, current_digest, video_path, overlay_data, st.session_state.text_caption_pairs,
+                            mode=output_mode, backend=render_backend,
+                        )
+                        st.success(f"Render job {job_id[:8]} queued.")
                     except Exception as e:
                         st.error(f"An error occurred: {e}")
                 else:
                     st.warning("Please ensure all fields are filled out.")
 
+        self.show_jobs(owner)
+
 if __name__ == "__main__":
-    app = FullProcess()
+    app = get_full_process()
     app.main()
@@ -0,0 +1,111 @@
+# Recall-vs-latency comparison of the FAISS index types the chatbot's vector store supports.
+#
+# Run from the repository root:
+#     python -m benchmarks.ann_index --vectors 1000000 --nprobe 8 16 32 --ef-search 32 64 128
+#     python -m benchmarks.ann_index --embeddings cached_embeddings.npy
+#
+# Without --embeddings it generates clustered synthetic vectors shaped like MiniLM output,
+# so the numbers are reproducible without the crawl or the embedding model.
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from ragbot.ann import build_index, configure_search
+
+
+def synthetic_embeddings(count, dim, clusters=256, seed=0):
+    generator = np.random.default_rng(seed)
+    centers = generator.normal(size=(clusters, dim)).astype(np.float32)
+    labels = generator.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.35 * generator.normal(size=(count, dim)).astype(np.float32)
+    # Sentence-transformer embeddings are unit length
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def index_memory_mb(index):
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+def measure(index, queries, truth, k):
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, found = index.search(query[np.newaxis], k)
+        latencies.append(time.perf_counter() - started)
+        hits += len(set(found[0]) & set(expected))
+    latencies.sort()
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p99_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types for the chatbot vector store.")
+    parser.add_argument("--embeddings", help="Cached embeddings as a .npy float32 matrix")
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads; 1 matches one request at a time")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+    else:
+        vectors = synthetic_embeddings(args.vectors + args.queries, args.dim)
+
+    # Queries are held out from the indexed corpus
+    corpus, queries = vectors[:-args.queries], vectors[-args.queries:]
+    dim = corpus.shape[1]
+
+    flat = build_index("flat", dim)
+    flat.add(corpus)
+    _, truth = flat.search(queries, args.k)
+
+    rows = []
+    result = measure(flat, queries, truth, args.k)
+    rows.append(("flat", "-", 0.0, index_memory_mb(flat), result))
+
+    for index_type in ("ivf", "ivfpq"):
+        started = time.perf_counter()
+        index = build_index(index_type, dim, train_vectors=corpus, nlist=args.nlist, pq_m=args.pq_m)
+        index.add(corpus)
+        build_seconds = time.perf_counter() - started
+        memory = index_memory_mb(index)
+        for nprobe in args.nprobe:
+            configure_search(index, nprobe=nprobe)
+            rows.append((index_type, f"nprobe={nprobe}", build_seconds, memory, measure(index, queries, truth, args.k)))
+
+    started = time.perf_counter()
+    index = build_index("hnsw", dim, hnsw_m=args.hnsw_m)
+    index.add(corpus)
+    build_seconds = time.perf_counter() - started
+    memory = index_memory_mb(index)
+    for ef_search in args.ef_search:
+        configure_search(index, ef_search=ef_search)
+        rows.append(("hnsw", f"efSearch={ef_search}", build_seconds, memory, measure(index, queries, truth, args.k)))
+
+    print(f"{len(corpus)} vectors, dim {dim}, {len(queries)} queries, recall@{args.k} against flat")
+    print(f"{'index':<7} {'setting':<14} {'build s':>8} {'memory MB':>10} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for index_type, setting, build_seconds, memory, result in rows:
+        print(
+            f"{index_type:<7} {setting:<14} {build_seconds:>8.1f} {memory:>10.1f} "
+            f"{result['recall']:>7.3f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Stand-ins for the chatbot's models, shared by the benchmarks and the tests.
+#
+# HashEmbeddings replaces the sentence-transformer and FakeLLMServer the text-generation-inference
+# endpoint, so retrieval and streaming can be exercised without downloads or a GPU.
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class HashEmbeddings:
+    # Feature-hashed bag of words: deterministic, instant, similar texts land close together
+    # and a text's nearest neighbour is itself
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def __call__(self, text):
+        return self.embed_query(text)
+
+
+class FakeLLMServer:
+    """Local text-generation-inference stand-in: streams ``tokens`` SSE events per request, ``token_delay`` apart.
+
+    Records how many requests arrived and the most that were being served at once.
+    """
+
+    def __init__(self, tokens=("Hello", " ", "world", "!"), token_delay=0.01):
+        self.tokens = list(tokens)
+        self.token_delay = token_delay
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    fake.requests += 1
+                    fake.active += 1
+                    fake.max_active = max(fake.max_active, fake.active)
+                    fake.prompts.append(payload["inputs"])
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for text in fake.tokens:
+                        time.sleep(fake.token_delay)
+                        self._chunk(f"data: {json.dumps({'token': {'text': text, 'special': False}})}\n\n")
+                    self._chunk("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                finally:
+                    with fake._lock:
+                        fake.active -= 1
+
+            def _chunk(self, text):
+                data = text.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/generate_stream"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,290 @@
+# Reproducible per-stage benchmark of translation, rendering and retrieval, with stub models.
+#
+# Run from the repository root:
+#     python -m benchmarks.pipeline --output baseline.json
+#     python -m benchmarks.pipeline --baseline baseline.json --tolerance 0.2
+#     python -m benchmarks.pipeline --suites render --width 1920 --height 1080 --duration 20
+#
+# Nothing is downloaded: videos come from ffmpeg's test sources, translation goes through a stub
+# pipeline, embeddings are feature-hashed and the LLM is a local fake SSE server. The numbers
+# therefore track this repository's code, not model or network speed. With --baseline, any
+# timing that got slower than the tolerance is reported and the exit code is 1.
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import FakeLLMServer, HashEmbeddings
+from benchmarks.translation_backends import LANGUAGES, SENTENCES
+from tracing import count, span, tracer
+
+FONT = os.path.join("fonts", "NotoSans-VariableFont_wdth,wght.ttf")
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class StubPipeline:
+    # Stands in for the NLLB pipeline: fixed cost per generate call plus per text, deterministic output
+
+    def __init__(self, call_ms=20.0, text_ms=2.0):
+        self.call_seconds = call_ms / 1000
+        self.text_seconds = text_ms / 1000
+
+    def __call__(self, texts, src_lang, tgt_lang, batch_size=None):
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+        time.sleep(self.call_seconds + self.text_seconds * len(texts))
+        outputs = [{"translation_text": f"[{tgt_lang}] {text[::-1]}"} for text in texts]
+        return outputs if not single else outputs[:1]
+
+
+def bench_translate(args):
+    from videopluxtext.translate import TranslateMassage
+
+    translator = TranslateMassage(use_cache=False)
+    translator.translator = StubPipeline(args.stub_call_ms, args.stub_text_ms)
+
+    texts = [sentence for _ in range(args.repeats) for sentence in SENTENCES]
+    languages = [LANGUAGES[index % len(LANGUAGES)] for index in range(len(texts))]
+
+    single = []
+    for text, language in zip(texts, languages):
+        started = time.perf_counter()
+        translator.translate_input(text, language)
+        single.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    translator.translate_batch(texts, languages)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        "texts": len(texts),
+        "single_p50_ms": 1000 * _percentile(single, 0.5),
+        "single_total_s": sum(single),
+        "batch_total_s": batch_seconds,
+    }
+
+
+def _variants(work_dir, name, count, duration):
+    variants = []
+    for index in range(count):
+        overlays = [
+            {
+                "text": f"{SENTENCES[(index + slot) % len(SENTENCES)]} ({index})", "font": FONT, "font_size": 40,
+                "color": "#FFFFFF", "relative_x": 0.1, "relative_y": 0.2 + 0.4 * slot,
+                "start_time": slot * duration / 2, "duration": duration / 4,
+            }
+            for slot in range(2)
+        ]
+        variants.append({"output_path": os.path.join(work_dir, f"{name}{index}.mp4"), "overlays": overlays})
+    return variants
+
+
+def bench_render(args, work_dir):
+    from moviepy.editor import VideoFileClip
+
+    from videopluxtext import overlays
+    from videopluxtext.ffmpeg_backend import render_variants_ffmpeg
+    from videopluxtext.media import make_test_video
+    from videopluxtext.render import render_variants
+    from videopluxtext.smart_render import render_variants_partial
+
+    source_path = make_test_video(
+        os.path.join(work_dir, "source.mp4"), args.width, args.height, args.fps, args.duration, gop=args.fps * 2
+    )
+    frames = int(args.duration * args.fps) * args.variants
+
+    backends = {
+        "moviepy": lambda variants: render_variants(source_path, variants, fps=args.fps),
+        "ffmpeg": lambda variants: render_variants_ffmpeg(source_path, variants, fps=args.fps),
+        "overlay_only": lambda variants: render_variants_partial(source_path, variants),
+    }
+    results = {}
+    for name, render in backends.items():
+        # Every backend starts from cold rasters so none benefits from another's cache
+        with overlays._raster_cache_lock:
+            overlays._raster_cache.clear()
+        started = time.perf_counter()
+        render(_variants(work_dir, name, args.variants, args.duration))
+        elapsed = time.perf_counter() - started
+        results[name] = {"total_s": elapsed, "output_fps": frames / elapsed}
+
+    # Backend parity on the first variant: mean absolute pixel difference at a few points in time
+    differences = []
+    with VideoFileClip(os.path.join(work_dir, "moviepy0.mp4")) as expected, \
+            VideoFileClip(os.path.join(work_dir, "ffmpeg0.mp4")) as actual:
+        for t in np.linspace(0, args.duration, 6, endpoint=False)[1:]:
+            difference = np.abs(expected.get_frame(t).astype(np.float32) - actual.get_frame(t).astype(np.float32))
+            differences.append(float(difference.mean()))
+    results["parity"] = {"max_difference": max(differences)}
+    return results
+
+
+def synthetic_documents(count, seed=0):
+    generator = random.Random(seed)
+    words = [f"term{index}" for index in range(2000)]
+    boilerplate = "Contact our sales team for pricing. Visit our website to learn more."
+    for index in range(count):
+        sentences = [
+            " ".join(generator.choice(words) for _ in range(generator.randint(8, 20))).capitalize() + "."
+            for _ in range(generator.randint(10, 40))
+        ]
+        # Crawled pages share navigation and footer text, which the packer has to deduplicate
+        text = " ".join(sentences) + " " + boilerplate
+        yield f"https://example.com/page{index}", text, {"url": f"https://example.com/page{index}", "title": f"Page {index}"}
+
+
+def bench_retrieval(args, work_dir):
+    from ragbot.context_packing import ContextPacker
+    from ragbot.index_manager import IndexManager
+    from ragbot.llm_client import StreamingLLMClient
+
+    embeddings = HashEmbeddings()
+    index_manager = IndexManager(os.path.join(work_dir, "index"), embeddings, "hash-384")
+    started = time.perf_counter()
+    with span("index.sync"):
+        vectorstore = index_manager.sync(synthetic_documents(args.documents))
+    sync_seconds = time.perf_counter() - started
+
+    packer = ContextPacker(embeddings, token_budget=768, fetch_k=12)
+    server = FakeLLMServer([f"tok{index} " for index in range(args.llm_tokens)], args.llm_token_ms / 1000)
+    queries = [" ".join(text.split()[5:15]) for _, text, _ in synthetic_documents(args.queries, seed=1)]
+
+    async def answer(client, query):
+        # The same stages, under the same names, as the /chatbot handler in test.py
+        started = time.perf_counter()
+        count("chatbot.requests")
+        with span("chatbot.embed_query"):
+            query_embedding = embeddings.embed_query(query)
+        with span("chatbot.retrieve_and_pack"):
+            documents, packing = packer.pack(query_embedding, vectorstore, 3)
+        count("chatbot.prompt_tokens_saved", max(packing["prompt_tokens_saved"], 0))
+        prompt = "\n\n".join(document.page_content for document in documents) + f"\n\nQuestion: {query}"
+        first_token = None
+        llm_started = time.perf_counter()
+        with span("chatbot.llm"):
+            async for _ in client.stream(prompt):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                    tracer.record("chatbot.llm_first_token", time.perf_counter() - llm_started)
+                count("chatbot.tokens_streamed")
+        return time.perf_counter() - started, first_token, packing["prompt_tokens_saved"]
+
+    async def run():
+        client = StreamingLLMClient(server.url, max_concurrency=args.concurrency)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(query):
+            async with semaphore:
+                return await answer(client, query)
+
+        try:
+            return await asyncio.gather(*(bounded(query) for query in queries))
+        finally:
+            await client.aclose()
+
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+    finally:
+        server.close()
+
+    latencies = [latency for latency, _, _ in results]
+    first_tokens = [first_token for _, first_token, _ in results if first_token is not None]
+    return {
+        "sync_total_s": sync_seconds,
+        "answer_p50_ms": 1000 * _percentile(latencies, 0.5),
+        "answer_p95_ms": 1000 * _percentile(latencies, 0.95),
+        "first_token_p50_ms": 1000 * _percentile(first_tokens, 0.5),
+        "queries_per_second": len(queries) / elapsed,
+        "mean_prompt_tokens_saved": statistics.mean(saved for _, _, saved in results),
+    }
+
+
+def regressions(results, baseline, tolerance, path=""):
+    # Timings end in _s or _ms; anything slower than the baseline by more than tolerance is flagged
+    found = []
+    for key, value in results.items():
+        name = f"{path}{key}"
+        previous = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            found += regressions(value, previous or {}, tolerance, name + ".")
+        elif isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous > 0:
+            if (key.endswith("_s") or key.endswith("_ms")) and value > previous * (1 + tolerance):
+                found.append((name, previous, value))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of translate, render and retrieval with stub models.")
+    parser.add_argument("--suites", nargs="+", default=["translate", "render", "retrieval"])
+    parser.add_argument("--repeats", type=int, default=4)
+    parser.add_argument("--stub-call-ms", type=float, default=20.0)
+    parser.add_argument("--stub-text-ms", type=float, default=2.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--duration", type=int, default=10)
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-tokens", type=int, default=64)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--output", help="Write the results as JSON, to use as a later --baseline")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown as a fraction")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    results = {}
+    try:
+        if "translate" in args.suites:
+            results["translate"] = bench_translate(args)
+        if "render" in args.suites:
+            results["render"] = bench_render(args, work_dir)
+        if "retrieval" in args.suites:
+            results["retrieval"] = bench_retrieval(args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    rows, counters = tracer.summary()
+    results["stages"] = {row["stage"]: {"total_s": row["total_s"], "mean_ms": row["mean_ms"]} for row in rows}
+    results["counters"] = counters
+
+    for suite in ("translate", "render", "retrieval"):
+        if suite in results:
+            print(f"{suite}: {json.dumps(results[suite], indent=2)}")
+    print(f"{'stage':<28} {'count':>8} {'total s':>9} {'mean ms':>9} {'max ms':>9}")
+    for row in rows:
+        print(f"{row['stage']:<28} {row['count']:>8} {row['total_s']:>9.3f} {row['mean_ms']:>9.3f} {row['max_ms']:>9.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        found = regressions(results, baseline, args.tolerance)
+        for name, previous, value in found:
+            print(f"REGRESSION {name}: {previous:.4f} -> {value:.4f}")
+        if found:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
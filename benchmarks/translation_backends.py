@@ -0,0 +1,150 @@
+# Compare the translation backends on a fixed sentence set.
+#
+# Run from the repository root:
+#     python -m benchmarks.translation_backends --backends torch-fp32 torch-bf16 torch-int8 onnx
+#
+# Each backend is measured in its own process so peak RSS is not polluted by the others.
+import argparse
+import multiprocessing
+import statistics
+import time
+from collections import Counter
+from queue import Empty
+
+# Short overlay-style sentences, the kind of text the app actually translates
+SENTENCES = [
+    "Welcome to Runtime Solutions.",
+    "Engineering simulation made simple.",
+    "Call us today for a free consultation.",
+    "Our team has over twenty years of experience.",
+    "Visit our website to learn more.",
+    "Limited time offer, sign up now.",
+    "Trusted by leading automotive manufacturers.",
+    "Reduce noise and vibration in your products.",
+    "Training courses are available every month.",
+    "Thank you for watching.",
+    "Subscribe for more videos like this one.",
+    "Contact our sales team for pricing.",
+]
+
+LANGUAGES = ["Hindi", "Tamil", "Bengali"]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def _run_backend(backend, repeats, queue):
+    import asyncio
+
+    from videopluxtext.translate import TranslateMassage
+
+    translator = TranslateMassage(use_cache=False, backend=backend)
+    started = time.perf_counter()
+    asyncio.run(translator.load_pipline())
+    load_seconds = time.perf_counter() - started
+    tokenizer = translator.translator.tokenizer
+
+    # One untimed pass so lazy initialisation does not land in the percentiles
+    translator.translate_input(SENTENCES[0], LANGUAGES[0])
+
+    latencies = []
+    generated_tokens = 0
+    outputs = {}
+    for _ in range(repeats):
+        for language in LANGUAGES:
+            for sentence in SENTENCES:
+                started = time.perf_counter()
+                translation = translator.translate_input(sentence, language)[0]["translation_text"]
+                latencies.append(time.perf_counter() - started)
+                generated_tokens += len(tokenizer(translation).input_ids)
+                outputs[(language, sentence)] = translation
+
+    latencies.sort()
+    queue.put({
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "tokens_per_second": generated_tokens / sum(latencies),
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "peak_rss_mb": _peak_rss_mb(),
+        "outputs": outputs,
+    })
+
+
+def _char_ngrams(text, n):
+    text = text.replace(" ", "")
+    return Counter(text[index:index + n] for index in range(len(text) - n + 1))
+
+
+def chrf(hypothesis, reference, max_order=6, beta=2.0):
+    """Sentence-level chrF (character n-gram F-score), on a 0-100 scale."""
+    precisions, recalls = [], []
+    for n in range(1, max_order + 1):
+        hypothesis_ngrams = _char_ngrams(hypothesis, n)
+        reference_ngrams = _char_ngrams(reference, n)
+        if not hypothesis_ngrams or not reference_ngrams:
+            continue
+        overlap = sum((hypothesis_ngrams & reference_ngrams).values())
+        precisions.append(overlap / sum(hypothesis_ngrams.values()))
+        recalls.append(overlap / sum(reference_ngrams.values()))
+
+    if not precisions:
+        return 100.0 if hypothesis == reference else 0.0
+
+    precision = statistics.mean(precisions)
+    recall = statistics.mean(recalls)
+    if precision == 0 and recall == 0:
+        return 0.0
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NLLB translation backends.")
+    parser.add_argument("--backends", nargs="+", default=["torch-fp32", "torch-bf16", "torch-int8", "onnx"])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    # fp32 is the quality reference, so it always runs
+    backends = ["torch-fp32", *[backend for backend in args.backends if backend != "torch-fp32"]]
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in backends:
+        queue = context.Queue()
+        process = context.Process(target=_run_backend, args=(backend, args.repeats, queue))
+        process.start()
+
+        # A backend that cannot load (say, onnx without optimum) kills its process, not the benchmark
+        while backend not in results:
+            try:
+                results[backend] = queue.get(timeout=1)
+            except Empty:
+                if not process.is_alive():
+                    print(f"{backend}: failed with exit code {process.exitcode}")
+                    break
+        process.join()
+
+    reference = results.get("torch-fp32")
+    print(f"{'backend':<12} {'load s':>8} {'tok/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'peak MB':>9} {'chrF delta':>11}")
+    for backend, result in results.items():
+        delta = 0.0
+        if reference is not None and backend != "torch-fp32":
+            scores = [
+                chrf(result["outputs"][key], reference["outputs"][key]) for key in reference["outputs"]
+            ]
+            delta = statistics.mean(scores) - 100.0
+        print(
+            f"{backend:<12} {result['load_seconds']:>8.1f} {result['tokens_per_second']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['peak_rss_mb']:>9.0f} {delta:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
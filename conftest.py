@@ -0,0 +1 @@
+# Keeps the repository root importable (videopluxtext, ragbot, tracing) when running plain `pytest`
@@ -0,0 +1,89 @@
+import faiss
+import numpy as np
+
+# Index types the vector store can be built with; all of them use L2 distance like LangChain's default
+index_types = ("flat", "ivf", "hnsw", "ivfpq")
+
+# Rough lower bound FAISS wants per k-means centroid when training
+_points_per_centroid = 39
+
+
+def build_index(index_type, dim, train_vectors=None, nlist=1024, hnsw_m=32, ef_construction=200, pq_m=16, pq_nbits=8):
+    """Create (and train, where needed) an empty FAISS index of the given type.
+
+    The IVF list count and PQ code size shrink to what ``train_vectors`` can support,
+    so a small corpus still gets a working index instead of a training error.
+    """
+    if index_type not in index_types:
+        raise ValueError(f"Unknown index type: {index_type}. Choose one of {', '.join(index_types)}.")
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        return index
+
+    if train_vectors is None or len(train_vectors) == 0:
+        raise ValueError(f"A {index_type} index needs training vectors.")
+    train_vectors = np.ascontiguousarray(train_vectors, dtype=np.float32)
+    count = len(train_vectors)
+
+    nlist = max(1, min(nlist, count // _points_per_centroid))
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        if dim % pq_m:
+            raise ValueError(f"pq_m ({pq_m}) must divide the embedding dimension ({dim}).")
+        while pq_nbits > 4 and (1 << pq_nbits) * _points_per_centroid > count:
+            pq_nbits -= 1
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+
+    index.train(train_vectors)
+    return index
+
+
+def configure_search(index, nprobe=None, ef_search=None):
+    # Search-time knobs are not part of the build, so they are applied after every load
+    if nprobe is not None:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = nprobe
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def supports_removal(index):
+    # Only a flat index shifts the remaining vectors down on removal, which is what LangChain's
+    # FAISS.delete assumes when it renumbers index_to_docstore_id. IVF lists keep their old
+    # labels after remove_ids, and HNSW graphs cannot drop nodes at all.
+    return isinstance(index, faiss.IndexFlat)
+
+
+def rebuild_without(index, keep_positions, index_type, **build_params):
+    """Build a fresh index from the vectors stored at keep_positions, without re-embedding.
+
+    Meant for index types whose removal would break positional ids (IVF, IVF-PQ, HNSW).
+    IVF-style indexes keep their trained centroids and codebooks; HNSW is rebuilt.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Inverted lists are not stored in position order, so reconstruct through a direct map
+        ivf.make_direct_map()
+
+    if index.ntotal:
+        vectors = index.reconstruct_n(0, index.ntotal)[keep_positions]
+    else:
+        vectors = np.zeros((0, index.d), dtype=np.float32)
+
+    if ivf is not None:
+        fresh = faiss.clone_index(index)
+        fresh.reset()
+    else:
+        fresh = build_index(index_type, index.d, train_vectors=vectors, **build_params)
+    if len(vectors):
+        fresh.add(vectors)
+    return fresh
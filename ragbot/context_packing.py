@@ -0,0 +1,165 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+_sentence_boundary = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in _sentence_boundary.split(text) if sentence and sentence.strip()]
+
+
+def estimate_tokens(text, chars_per_token=4.0):
+    # Close enough for English prompts to the Mistral tokenizer, and free to compute
+    return max(1, int(len(text) / chars_per_token)) if text else 0
+
+
+class ContextPacker:
+    """Turns an over-fetched candidate set into a deduplicated, token-budgeted context.
+
+    Candidates are split into sentences, scored against the query embedding, and
+    picked greedily by maximal marginal relevance: sentences too similar to one
+    already picked are dropped as near-duplicates, and picking stops at
+    ``token_budget``. The most relevant sentence is always kept, even below
+    ``min_relevance`` or over budget. The picked sentences are regrouped by
+    source document in their original order, so the prompt still reads as
+    excerpts of pages.
+    """
+
+    def __init__(
+        self,
+        embedding_model,
+        token_budget=768,
+        fetch_k=12,
+        lambda_mult=0.7,
+        duplicate_threshold=0.92,
+        min_relevance=0.2,
+        chars_per_token=4.0,
+        sentence_cache_size=20000,
+    ):
+        self.embedding_model = embedding_model
+        self.token_budget = token_budget
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.duplicate_threshold = duplicate_threshold
+        self.min_relevance = min_relevance
+        self.chars_per_token = chars_per_token
+        self.sentence_cache_size = sentence_cache_size
+        self._sentence_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.baseline_tokens = 0
+        self.packed_tokens = 0
+
+    def _embed_sentences(self, sentences):
+        # Crawled pages repeat the same boilerplate, so sentence vectors are worth keeping around
+        vectors = {}
+        missing = []
+        with self._lock:
+            for sentence in sentences:
+                if sentence in self._sentence_cache:
+                    self._sentence_cache.move_to_end(sentence)
+                    vectors[sentence] = self._sentence_cache[sentence]
+                elif sentence not in vectors:
+                    missing.append(sentence)
+
+        if missing:
+            embedded = self.embedding_model.embed_documents(missing)
+            with self._lock:
+                for sentence, vector in zip(missing, embedded):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    norm = np.linalg.norm(vector)
+                    vector = vector / norm if norm else vector
+                    vectors[sentence] = vector
+                    self._sentence_cache[sentence] = vector
+                while len(self._sentence_cache) > self.sentence_cache_size:
+                    self._sentence_cache.popitem(last=False)
+
+        return np.stack([vectors[sentence] for sentence in sentences])
+
+    def pack(self, query_embedding, vectorstore, k):
+        """Return (documents, stats) for the prompt, where stats compares against stuffing the top-k chunks."""
+        candidates = vectorstore.similarity_search_by_vector(query_embedding, k=max(self.fetch_k, k))
+        baseline = sum(estimate_tokens(document.page_content, self.chars_per_token) for document in candidates[:k])
+
+        # Sentences with the document they came from; exact repeats across pages are dropped here
+        sentences, origins, seen = [], [], set()
+        for document_index, document in enumerate(candidates):
+            for position, sentence in enumerate(split_sentences(document.page_content)):
+                key = " ".join(sentence.lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                sentences.append(sentence)
+                origins.append((document_index, position))
+
+        selected = []
+        if sentences:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            query = query / norm if norm else query
+            vectors = self._embed_sentences(sentences)
+            relevance = vectors @ query
+
+            used = 0
+            best_redundancy = np.full(len(sentences), -1.0, dtype=np.float32)
+            available = relevance >= self.min_relevance
+            # Never hand the LLM an empty context: the best sentence is kept even when it scores low
+            available[int(np.argmax(relevance))] = True
+            while available.any():
+                scores = self.lambda_mult * relevance - (1 - self.lambda_mult) * np.maximum(best_redundancy, 0)
+                scores[~available] = -np.inf
+                choice = int(np.argmax(scores))
+                available[choice] = False
+
+                cost = estimate_tokens(sentences[choice], self.chars_per_token)
+                if selected and used + cost > self.token_budget:
+                    continue
+                selected.append(choice)
+                used += cost
+
+                # Anything this close to a picked sentence is a near-duplicate and is never picked
+                similarity = vectors @ vectors[choice]
+                best_redundancy = np.maximum(best_redundancy, similarity)
+                available &= best_redundancy < self.duplicate_threshold
+
+        # Regroup by source document, documents ordered by their best sentence, sentences in page order
+        grouped = OrderedDict()
+        for choice in selected:
+            document_index, position = origins[choice]
+            grouped.setdefault(document_index, []).append((position, sentences[choice]))
+
+        documents = [
+            Document(
+                page_content=" ".join(sentence for _, sentence in sorted(parts)),
+                metadata=candidates[document_index].metadata,
+            )
+            for document_index, parts in grouped.items()
+        ]
+        packed = sum(estimate_tokens(document.page_content, self.chars_per_token) for document in documents)
+
+        with self._lock:
+            self.requests += 1
+            self.baseline_tokens += baseline
+            self.packed_tokens += packed
+
+        return documents, {
+            "candidates": len(candidates),
+            "baseline_context_tokens": baseline,
+            "packed_context_tokens": packed,
+            # Packing can come out longer than the top-k chunks it replaces; that saves nothing
+            "prompt_tokens_saved": max(baseline - packed, 0),
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "baseline_context_tokens": self.baseline_tokens,
+                "packed_context_tokens": self.packed_tokens,
+                "prompt_tokens_saved": max(self.baseline_tokens - self.packed_tokens, 0),
+            }
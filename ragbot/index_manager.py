@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from ragbot.ann import build_index, configure_search, rebuild_without, supports_removal
+from ragbot.ingest import BatchEmbedder, chunk_text
+
+
+def content_hash(text, metadata):
+    payload = json.dumps({"text": text, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IndexManager:
+    """Keeps the FAISS index in step with the crawl by re-embedding only what changed.
+
+    A manifest next to the index records each document's content hash and the
+    vector ids of its chunks. Documents are streamed: new and changed ones are
+    chunked, embedded in parallel batches and written to the index every
+    ``write_batch_size`` chunks, so memory stays bounded however large the crawl
+    is. Deleted documents are removed at the end, and when nothing changed the
+    stored index is loaded without embedding anything.
+    """
+
+    manifest_version = 2
+
+    def __init__(
+        self,
+        index_dir,
+        embedding_model,
+        embedding_model_name,
+        chunk_size=1000,
+        chunk_overlap=200,
+        embed_batch_size=64,
+        embed_workers=4,
+        write_batch_size=1024,
+        index_type="flat",
+        index_params=None,
+        train_size=50000,
+        nprobe=None,
+        ef_search=None,
+    ):
+        self.index_dir = index_dir
+        self.embedding_model = embedding_model
+        self.embedding_model_name = embedding_model_name
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embed_batch_size = embed_batch_size
+        self.embed_workers = embed_workers
+        self.write_batch_size = write_batch_size
+        # flat, ivf, hnsw or ivfpq; see ragbot.ann.build_index for index_params
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        # Trainable indexes (IVF, IVF-PQ) wait for this many chunks before the first write
+        self.train_size = train_size
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.manifest_path = os.path.join(index_dir, "manifest.json")
+        self.version = None
+        self.last_sync = {}
+
+    def _settings(self):
+        # Anything that changes what a vector means forces a full rebuild
+        return {
+            "embedding_model": self.embedding_model_name,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "index_type": self.index_type,
+            "index_params": self.index_params,
+        }
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path) or not os.path.exists(os.path.join(self.index_dir, "index.faiss")):
+            return None
+        with open(self.manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        if manifest.get("version") != self.manifest_version or manifest.get("settings") != self._settings():
+            return None
+        return manifest
+
+    def _save_manifest(self, documents):
+        manifest = {
+            "version": self.manifest_version,
+            "settings": self._settings(),
+            "documents": documents,
+        }
+        partial_path = self.manifest_path + ".part"
+        with open(partial_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        os.replace(partial_path, self.manifest_path)
+
+    @staticmethod
+    def _fingerprint(documents):
+        digest = hashlib.sha256()
+        for doc_id in sorted(documents):
+            digest.update(doc_id.encode("utf-8"))
+            digest.update(documents[doc_id]["hash"].encode("utf-8"))
+        return digest.hexdigest()
+
+    def _load_index(self):
+        db = FAISS.load_local(self.index_dir, self.embedding_model, allow_dangerous_deserialization=True)
+        configure_search(db.index, nprobe=self.nprobe, ef_search=self.ef_search)
+        return db
+
+    def _write(self, db, embedder, texts, metadatas, ids):
+        vectors = embedder.embed(texts)
+        if db is None:
+            # The first batch doubles as the training set for IVF-style indexes
+            index = build_index(
+                self.index_type, len(vectors[0]), train_vectors=np.asarray(vectors, dtype=np.float32), **self.index_params
+            )
+            configure_search(index, nprobe=self.nprobe, ef_search=self.ef_search)
+            db = FAISS(self.embedding_model, index, InMemoryDocstore(), {})
+        db.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        return db
+
+    def _delete(self, db, ids):
+        if supports_removal(db.index):
+            db.delete(ids)
+            return
+
+        # Removal from anything but a flat index breaks positional ids, so rebuild from the stored vectors
+        removed = set(ids)
+        positions = sorted(db.index_to_docstore_id.items())
+        keep = [position for position, doc_id in positions if doc_id not in removed]
+        db.index = rebuild_without(db.index, keep, self.index_type, **self.index_params)
+        configure_search(db.index, nprobe=self.nprobe, ef_search=self.ef_search)
+        db.docstore.delete([doc_id for _, doc_id in positions if doc_id in removed])
+        db.index_to_docstore_id = {
+            position: db.index_to_docstore_id[old_position] for position, old_position in enumerate(keep)
+        }
+
+    def sync(self, documents):
+        """Bring the index up to date with ``documents``, an iterable of (doc_id, text, metadata)."""
+        started = time.perf_counter()
+        manifest = self._load_manifest()
+        previous = manifest["documents"] if manifest else {}
+        db = None
+        db_loaded = manifest is None
+
+        current = {}
+        stale_ids = []
+        pending_texts, pending_metadata, pending_ids = [], [], []
+        documents_seen = documents_embedded = chunks_embedded = 0
+        embedder = BatchEmbedder(self.embedding_model, batch_size=self.embed_batch_size, workers=self.embed_workers)
+
+        try:
+            for doc_id, text, metadata in documents:
+                documents_seen += 1
+                digest = content_hash(text, metadata)
+                entry = previous.get(doc_id)
+                if entry is not None and entry["hash"] == digest:
+                    current[doc_id] = entry
+                    continue
+
+                if entry is not None:
+                    stale_ids.extend(entry["ids"])
+
+                chunk_ids = []
+                for offset, chunk in chunk_text(text, self.chunk_size, self.chunk_overlap):
+                    chunk_id = f"{doc_id}#{digest[:16]}#{offset}"
+                    chunk_ids.append(chunk_id)
+                    pending_texts.append(chunk)
+                    pending_metadata.append({**metadata, "offset": offset})
+                    pending_ids.append(chunk_id)
+                current[doc_id] = {"hash": digest, "ids": chunk_ids}
+                documents_embedded += 1
+
+                # Flush in bounded batches so only write_batch_size chunks are in memory at once
+                threshold = self.write_batch_size
+                if db is None and manifest is None and self.index_type in ("ivf", "ivfpq"):
+                    threshold = max(threshold, self.train_size)
+                if len(pending_ids) >= threshold:
+                    if not db_loaded:
+                        db, db_loaded = self._load_index(), True
+                    db = self._write(db, embedder, pending_texts, pending_metadata, pending_ids)
+                    chunks_embedded += len(pending_ids)
+                    pending_texts, pending_metadata, pending_ids = [], [], []
+
+            if pending_ids:
+                if not db_loaded:
+                    db, db_loaded = self._load_index(), True
+                db = self._write(db, embedder, pending_texts, pending_metadata, pending_ids)
+                chunks_embedded += len(pending_ids)
+        finally:
+            embedder.close()
+
+        stale_ids.extend(
+            vector_id for doc_id, entry in previous.items() if doc_id not in current for vector_id in entry["ids"]
+        )
+
+        if not any(entry["ids"] for entry in current.values()):
+            raise ValueError("There are no documents to index.")
+
+        if stale_ids:
+            if not db_loaded:
+                db, db_loaded = self._load_index(), True
+            self._delete(db, stale_ids)
+
+        elapsed = time.perf_counter() - started
+        self.version = self._fingerprint(current)
+        self.last_sync = {
+            "documents": documents_seen,
+            "embedded_documents": documents_embedded,
+            "embedded_chunks": chunks_embedded,
+            "removed_vectors": len(stale_ids),
+            "seconds": elapsed,
+            # Unchanged documents are only hashed, so throughput counts what was actually embedded
+            "embedded_docs_per_second": documents_embedded / elapsed if elapsed else 0.0,
+            "chunks_per_second": chunks_embedded / elapsed if elapsed else 0.0,
+        }
+
+        # Nothing changed: the stored index is already current
+        if db is None:
+            return self._load_index()
+
+        db.save_local(self.index_dir)
+        self._save_manifest(current)
+        return db
@@ -0,0 +1,110 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(path, read_size=1 << 20):
+    """Yield the items of a top-level JSON array one at a time, reading the file in blocks.
+
+    Only the current block and the item being decoded are held in memory, so the
+    crawl file can be larger than RAM.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        buffer = ""
+        position = 0
+        started = False
+
+        while True:
+            # Skip whitespace and separators between items
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+
+            if position < len(buffer):
+                if not started:
+                    if buffer[position] != "[":
+                        raise ValueError(f"{path} is not a JSON array.")
+                    started = True
+                    position += 1
+                    continue
+
+                if buffer[position] == "]":
+                    return
+
+                try:
+                    item, end = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # The item runs past the end of the buffer; read more and retry below
+                    item = end = None
+
+                # A number cut off by the block boundary still decodes ("45" of "456"), so an item only
+                # counts once the character after it, which a JSON array always has, is in the buffer too
+                if end is not None and end < len(buffer) and buffer[end] in " \t\r\n,]":
+                    position = end
+                    yield item
+                    continue
+
+            block = file.read(read_size)
+            if not block:
+                if position < len(buffer):
+                    raise ValueError(f"{path} has a malformed item near character {position}.")
+                raise ValueError(f"{path} ended before the JSON array was closed.")
+            buffer = buffer[position:] + block
+            position = 0
+
+
+def chunk_text(text, chunk_size=1000, chunk_overlap=200):
+    """Split text into overlapping chunks, preferring to cut at whitespace. Yields (offset, chunk)."""
+    text = text.strip()
+    if len(text) <= chunk_size:
+        if text:
+            yield 0, text
+        return
+
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Back off to the last space so words are not split, unless that would leave a tiny chunk
+            cut = text.rfind(" ", start + chunk_size // 2, end)
+            if cut != -1:
+                end = cut
+        yield start, text[start:end].strip()
+        if end >= len(text):
+            return
+        start = max(end - chunk_overlap, start + 1)
+
+
+def iter_crawl_documents(path):
+    """Stream crawl entries as (doc_id, text, metadata); the URL identifies a page across crawls."""
+    seen = set()
+    for index, entry in enumerate(iter_json_array(path)):
+        url = entry.get("url", "")
+        doc_id = url or f"entry-{index}"
+        if doc_id in seen:
+            doc_id = f"{doc_id}#{index}"
+        seen.add(doc_id)
+
+        parts = [entry.get("title", ""), entry.get("description", ""), entry.get("content") or entry.get("text") or ""]
+        text = "\n".join(part for part in parts if part)
+        yield doc_id, text, {"url": url, "title": entry.get("title", "")}
+
+
+class BatchEmbedder:
+    """Embeds texts in fixed-size batches spread over a thread pool, preserving order."""
+
+    def __init__(self, embedding_model, batch_size=64, workers=4):
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed")
+
+    def embed(self, texts):
+        batches = [texts[index:index + self.batch_size] for index in range(0, len(texts), self.batch_size)]
+        vectors = []
+        for batch_vectors in self._executor.map(self.embedding_model.embed_documents, batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def close(self):
+        self._executor.shutdown()
@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import httpx
+
+
+class StreamingLLMClient:
+    """Async client for a text-generation-inference style endpoint that streams tokens over SSE.
+
+    One pooled ``httpx.AsyncClient`` keeps connections alive across requests, and a
+    semaphore caps how many generations run against the endpoint at once.
+    """
+
+    def __init__(
+        self,
+        endpoint_url,
+        token=None,
+        max_connections=32,
+        max_keepalive_connections=16,
+        max_concurrency=8,
+        timeout=120.0,
+        temperature=0.2,
+        max_new_tokens=512,
+    ):
+        self.endpoint_url = endpoint_url
+        self.token = token
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.timeout = timeout
+        self.parameters = {"temperature": temperature, "max_new_tokens": max_new_tokens}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = None
+
+    def _http(self):
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+            )
+        return self._client
+
+    async def stream(self, prompt):
+        """Yield generated text pieces as the endpoint produces them."""
+        payload = {"inputs": prompt, "parameters": self.parameters, "stream": True}
+        async with self._semaphore:
+            async with self._http().stream("POST", self.endpoint_url, json=payload) as response:
+                if response.status_code >= 400:
+                    body = await response.aread()
+                    raise RuntimeError(f"LLM endpoint returned {response.status_code}: {body.decode(errors='replace')}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if not data or data == "[DONE]":
+                        continue
+                    event = json.loads(data)
+                    if "error" in event:
+                        raise RuntimeError(f"LLM endpoint error: {event['error']}")
+                    token = event.get("token") or {}
+                    if token.get("special"):
+                        continue
+                    if token.get("text"):
+                        yield token["text"]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def sse_stream(tokens, finish):
+    """Frame a token stream as server-sent events for the chatbot's streaming endpoint.
+
+    Every token becomes a ``data: {"token": ...}`` event in order. The stream ends with exactly
+    one terminal event: ``done`` carrying ``finish(answer)``, or ``error`` if the stream failed.
+    """
+    pieces = []
+    try:
+        async for token in tokens:
+            pieces.append(token)
+            yield sse_event({"token": token})
+    except Exception as error:
+        yield sse_event({"error": str(error)}, event="error")
+        return
+    yield sse_event(finish("".join(pieces)), event="done")
+
+
+class _Broadcast:
+    # Tokens of one in-flight generation, replayable by every caller that joined it
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.condition = asyncio.Condition()
+
+
+class InflightCoalescer:
+    """Shares one generation between identical concurrent prompts.
+
+    The first caller for a prompt starts the generation; everyone who asks for the
+    same prompt before it finishes replays its tokens instead of calling the LLM again.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def _produce(self, key, source, broadcast):
+        try:
+            async for token in source:
+                async with broadcast.condition:
+                    broadcast.tokens.append(token)
+                    broadcast.condition.notify_all()
+        except Exception as error:
+            broadcast.error = error
+        finally:
+            async with broadcast.condition:
+                broadcast.done = True
+                broadcast.condition.notify_all()
+            self._inflight.pop(key, None)
+
+    async def stream(self, key, start):
+        """Yield the tokens for ``key``, calling ``start()`` for a new token stream only if none is in flight."""
+        broadcast = self._inflight.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._inflight[key] = broadcast
+            self.started += 1
+            # The producer is its own task, so one caller disconnecting does not cut off the others
+            asyncio.get_running_loop().create_task(self._produce(key, start(), broadcast))
+        else:
+            self.coalesced += 1
+
+        position = 0
+        while True:
+            async with broadcast.condition:
+                await broadcast.condition.wait_for(lambda: len(broadcast.tokens) > position or broadcast.done)
+                pending = broadcast.tokens[position:]
+                finished = broadcast.done
+            for token in pending:
+                yield token
+            position += len(pending)
+            if finished and position == len(broadcast.tokens):
+                if broadcast.error is not None:
+                    raise broadcast.error
+                return
+
+    async def collect(self, key, start):
+        return "".join([token async for token in self.stream(key, start)])
+
+    def stats(self):
+        return {"inflight": len(self._inflight), "started": self.started, "coalesced": self.coalesced}
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class _Entry:
+    __slots__ = ("embedding", "response", "created", "index_version")
+
+    def __init__(self, embedding, response, index_version):
+        self.embedding = embedding
+        self.response = response
+        self.created = time.time()
+        self.index_version = index_version
+
+
+class ResponseCache:
+    """Answer cache for the chatbot: exact query match first, then nearest cached query by cosine similarity.
+
+    Entries expire after ``ttl_seconds``, the least recently used ones are evicted
+    past ``max_entries``, and every entry is tied to the index version it was
+    answered from, so a rebuilt index never serves answers from the old one.
+    """
+
+    def __init__(self, similarity_threshold=0.95, ttl_seconds=3600, max_entries=1024, enabled=True):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.index_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Stacked embeddings of every entry, rebuilt lazily after the entry set changes
+        self._matrix = None
+        self._matrix_keys = []
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry, now):
+        return now - entry.created > self.ttl_seconds or entry.index_version != self.index_version
+
+    def _drop(self, key):
+        del self._entries[key]
+        self._matrix = None
+
+    def lookup(self, query, embedding):
+        if not self.enabled:
+            return None
+
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry, now):
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry.response
+                self._drop(key)
+
+            match = self._nearest(self._unit(embedding), now)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.semantic_hits += 1
+                return self._entries[match].response
+
+            self.misses += 1
+            return None
+
+    def _nearest(self, vector, now):
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key].embedding for key in self._matrix_keys])
+
+        similarities = self._matrix @ vector
+        # Best candidates first; stale ones are skipped (and dropped) until a live one is found
+        for position in np.argsort(-similarities):
+            if similarities[position] < self.similarity_threshold:
+                return None
+            key = self._matrix_keys[position]
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if self._expired(entry, now):
+                self._drop(key)
+                continue
+            return key
+        return None
+
+    def store(self, query, embedding, response):
+        if not self.enabled:
+            return
+
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = _Entry(self._unit(embedding), response, self.index_version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self, index_version=None):
+        """Forget every answer, and tie new ones to ``index_version``."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.index_version = index_version
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "index_version": self.index_version,
+            }
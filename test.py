@@ -1,56 +1,93 @@
 import os
 import json
+import logging
+import threading
+import time
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import PromptTemplate
-from langchain_huggingface import HuggingFaceEndpoint, HuggingFaceEmbeddings
-
-# Load JSON data
+from langchain_huggingface import HuggingFaceEmbeddings
+from ragbot.context_packing import ContextPacker
+from ragbot.index_manager import IndexManager
+from ragbot.ingest import iter_crawl_documents
+from ragbot.llm_client import InflightCoalescer, StreamingLLMClient, sse_event, sse_stream
+from ragbot.response_cache import ResponseCache
+from tracing import count, span, tracer
+
+# Startup progress (index sync) is reported at INFO, next to uvicorn's own log lines
+logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# Crawl data, streamed entry by entry during indexing
 file_path = "data/www.runtime-solutions.com_crawl_results.json"
-with open(file_path, "r", encoding="utf-8") as file:
-    data = json.load(file)
+
+# Close the pooled LLM connections on shutdown
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await llm_client.aclose()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Define request model
 class QueryRequest(BaseModel):
     query: str
 
 # Load embedding model
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-# Prepare FAISS vector store
-def create_vectorstore():
-    texts = [entry.get("title", "") + " " + entry.get("description", "") for entry in data]
-    metadata = [{"url": entry.get("url", "")} for entry in data]
-    db = FAISS.from_texts(texts, embedding_model, metadatas=metadata)
-    db.save_local("vectorstore/db_faiss")
-    return db
-
-vectorstore = create_vectorstore()
-
-# Load FAISS
-def get_vectorstore():
-    return FAISS.load_local("vectorstore/db_faiss", embedding_model, allow_dangerous_deserialization=True)
+embedding_model_name = "sentence-transformers/all-MiniLM-L6-v2"
+embedding_model = HuggingFaceEmbeddings(model_name=embedding_model_name)
+
+# Prepare FAISS vector store, re-embedding only new or changed pages
+index_manager = IndexManager(
+    "vectorstore/db_faiss",
+    embedding_model,
+    embedding_model_name,
+    chunk_size=int(os.getenv("INGEST_CHUNK_SIZE", "1000")),
+    chunk_overlap=int(os.getenv("INGEST_CHUNK_OVERLAP", "200")),
+    embed_batch_size=int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64")),
+    embed_workers=int(os.getenv("INGEST_EMBED_WORKERS", "4")),
+    write_batch_size=int(os.getenv("INGEST_WRITE_BATCH_SIZE", "1024")),
+    # flat (exact), ivf, hnsw or ivfpq; build parameters such as nlist or pq_m go in FAISS_INDEX_PARAMS as JSON
+    index_type=os.getenv("FAISS_INDEX_TYPE", "flat"),
+    index_params=json.loads(os.getenv("FAISS_INDEX_PARAMS", "{}")),
+    train_size=int(os.getenv("FAISS_TRAIN_SIZE", "50000")),
+    nprobe=int(os.getenv("FAISS_NPROBE", "16")),
+    ef_search=int(os.getenv("FAISS_EF_SEARCH", "64")),
+)
+with span("index.sync"):
+    vectorstore = index_manager.sync(iter_crawl_documents(file_path))
+logger.info(
+    "Vector store synced: %d documents, %d embedded at %.1f docs/s, %d chunks at %.1f chunks/s",
+    index_manager.last_sync["documents"],
+    index_manager.last_sync["embedded_documents"],
+    index_manager.last_sync["embedded_docs_per_second"],
+    index_manager.last_sync["embedded_chunks"],
+    index_manager.last_sync["chunks_per_second"],
+)
 
-vectorstore = get_vectorstore()
+# Number of chunks handed to the LLM per question
+retriever_k = int(os.getenv("RETRIEVER_K", "3"))
 
 # Load LLM
 HF_TOKEN = os.getenv("HF_TOKEN")
 huggingface_repo_id = "mistralai/Mistral-7B-Instruct-v0.3"
 
-def load_llm():
-    return HuggingFaceEndpoint(
-        repo_id=huggingface_repo_id,
-        temperature=0.2,
-        model_kwargs={"token": HF_TOKEN, "max_length": "512"}
-    )
-
-llm = load_llm()
+# Streams tokens from the inference endpoint over pooled keep-alive connections
+llm_client = StreamingLLMClient(
+    os.getenv("LLM_ENDPOINT_URL", f"https://api-inference.huggingface.co/models/{huggingface_repo_id}"),
+    token=HF_TOKEN,
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "32")),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    temperature=0.2,
+    max_new_tokens=512,
+)
+# Identical questions asked at the same time share one generation
+inflight = InflightCoalescer()
 
 # Custom Prompt
 custom_prompt_template = """
@@ -65,19 +102,135 @@ Start the answer directly. No small talk please.
 
 prompt = PromptTemplate(template=custom_prompt_template, input_variables=["context", "question"])
 
-# Create Retrieval QA Chain
-qa_chain = RetrievalQA.from_chain_type(
-    llm=llm,
-    chain_type="stuff",
-    retriever=vectorstore.as_retriever(search_kwargs={'k': 3}),
-    return_source_documents=True,
-    chain_type_kwargs={'prompt': prompt}
+# Over-fetches, drops near-duplicate sentences and packs the most relevant ones into a token budget
+context_packer = None
+if os.getenv("CONTEXT_PACKING", "1") != "0":
+    context_packer = ContextPacker(
+        embedding_model,
+        token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "768")),
+        fetch_k=int(os.getenv("CONTEXT_FETCH_K", "12")),
+        lambda_mult=float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7")),
+        duplicate_threshold=float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.92")),
+    )
+
+def build_prompt(question, documents):
+    # Same layout the "stuff" chain used: page contents separated by blank lines
+    context = "\n\n".join(document.page_content for document in documents)
+    return prompt.format(context=context, question=question)
+
+def serialize_documents(documents):
+    return [{"page_content": document.page_content, "metadata": document.metadata} for document in documents]
+
+async def retrieve(query):
+    count("chatbot.requests")
+    # Embedding and FAISS search are CPU-bound, so they run off the event loop
+    with span("chatbot.embed_query"):
+        query_embedding = await run_in_threadpool(embedding_model.embed_query, query)
+    with span("chatbot.cache_lookup"):
+        cached = response_cache.lookup(query, query_embedding)
+    if cached is not None:
+        count("chatbot.cache_hits")
+        return query_embedding, cached, None, {}
+    if context_packer is None:
+        with span("chatbot.retrieve"):
+            documents = await run_in_threadpool(vectorstore.similarity_search_by_vector, query_embedding, k=retriever_k)
+        return query_embedding, None, documents, {}
+    with span("chatbot.retrieve_and_pack"):
+        documents, packing = await run_in_threadpool(context_packer.pack, query_embedding, vectorstore, retriever_k)
+    # Counters only go up; a packed context longer than the baseline saved nothing
+    count("chatbot.prompt_tokens_saved", max(packing["prompt_tokens_saved"], 0))
+    return query_embedding, None, documents, packing
+
+async def generate(prompt_text):
+    # Yields the answer's tokens while timing the LLM call and its first token
+    started = time.perf_counter()
+    first_token = True
+    with span("chatbot.llm"):
+        try:
+            async for token in inflight.stream(prompt_text, lambda: llm_client.stream(prompt_text)):
+                if first_token:
+                    tracer.record("chatbot.llm_first_token", time.perf_counter() - started)
+                    first_token = False
+                count("chatbot.tokens_streamed")
+                yield token
+        except Exception:
+            count("chatbot.llm_errors")
+            raise
+
+# Answers to repeated or near-identical questions, tied to the index version they came from
+response_cache = ResponseCache(
+    similarity_threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+    enabled=os.getenv("RESPONSE_CACHE", "1") != "0",
 )
+response_cache.invalidate(index_manager.version)
+reindex_lock = threading.Lock()
 
 @app.post("/chatbot/")
-def chatbot(request: QueryRequest):
-    response = qa_chain.invoke({'query': request.query})
-    return {"response": response["result"], "source_documents": response["source_documents"]}
+async def chatbot(request: QueryRequest):
+    query_embedding, cached, documents, packing = await retrieve(request.query)
+    if cached is not None:
+        return cached
+
+    prompt_text = build_prompt(request.query, documents)
+    answer = "".join([token async for token in generate(prompt_text)])
+    response = {"response": answer, "source_documents": serialize_documents(documents)}
+    response_cache.store(request.query, query_embedding, response)
+    return {**response, **packing}
+
+@app.post("/chatbot/stream")
+async def chatbot_stream(request: QueryRequest):
+    query_embedding, cached, documents, packing = await retrieve(request.query)
+
+    async def events():
+        if cached is not None:
+            yield sse_event({"token": cached["response"]})
+            yield sse_event({"source_documents": cached["source_documents"]}, event="done")
+            return
+
+        prompt_text = build_prompt(request.query, documents)
+        sources = serialize_documents(documents)
+
+        def finish(answer):
+            response_cache.store(request.query, query_embedding, {"response": answer, "source_documents": sources})
+            return {"source_documents": sources, **packing}
+
+        async for event in sse_stream(generate(prompt_text), finish):
+            yield event
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/chatbot/cache")
+def chatbot_cache():
+    stats = {**response_cache.stats(), "llm": inflight.stats()}
+    if context_packer is not None:
+        stats["context_packing"] = context_packer.stats()
+    return stats
+
+@app.get("/metrics")
+def metrics():
+    # Stage timings and counters, plus the caches' current state as gauges
+    cache_stats = response_cache.stats()
+    gauges = {
+        "response_cache_entries": cache_stats["entries"],
+        "response_cache_hit_rate": cache_stats["hit_rate"],
+        "llm_inflight": inflight.stats()["inflight"],
+    }
+    lines = [tracer.prometheus(prefix="ragbot")]
+    for name, value in gauges.items():
+        lines.append(f"# TYPE ragbot_{name} gauge\nragbot_{name} {value}\n")
+    return PlainTextResponse("".join(lines), media_type="text/plain; version=0.0.4")
+
+@app.post("/vectorstore/sync")
+def vectorstore_sync():
+    # Pick up a new crawl without a restart; cached answers from the old index are dropped
+    global vectorstore
+    with reindex_lock, span("index.sync"):
+        vectorstore = index_manager.sync(iter_crawl_documents(file_path))
+        if index_manager.version != response_cache.index_version:
+            response_cache.invalidate(index_manager.version)
+    return index_manager.last_sync
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
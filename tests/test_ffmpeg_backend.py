@@ -0,0 +1,76 @@
+import os
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("moviepy")
+
+from moviepy.config import FFMPEG_BINARY  # noqa: E402
+from moviepy.editor import VideoFileClip  # noqa: E402
+
+from videopluxtext.ffmpeg_backend import render_variants_ffmpeg  # noqa: E402
+from videopluxtext.media import make_test_video, run_ffmpeg  # noqa: E402
+from videopluxtext.overlays import OverlayPlacement  # noqa: E402
+from videopluxtext.render import render_variants  # noqa: E402
+
+FONT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fonts", "NotoSans-VariableFont_wdth,wght.ttf")
+
+pytestmark = [
+    pytest.mark.skipif(not (os.path.exists(FFMPEG_BINARY) or shutil.which(FFMPEG_BINARY)), reason="ffmpeg not found"),
+    pytest.mark.skipif(not os.path.exists(FONT), reason="font not found"),
+]
+
+
+def _region_difference(a, b, box):
+    x0, y0, x1, y1 = box
+    return np.abs(a[y0:y1, x0:x1].astype(np.float32) - b[y0:y1, x0:x1].astype(np.float32)).mean()
+
+
+def test_ffmpeg_backend_matches_moviepy(tmp_path):
+    source_path = make_test_video(str(tmp_path / "source.mp4"))
+    overlays = [{
+        "text": "Parity check", "font": FONT, "font_size": 30, "color": "#FFFFFF",
+        "relative_x": 0.1, "relative_y": 0.4, "start_time": 1.0, "duration": 1.0,
+    }]
+    moviepy_path = str(tmp_path / "moviepy.mp4")
+    ffmpeg_path = str(tmp_path / "ffmpeg.mp4")
+    render_variants(source_path, [{"output_path": moviepy_path, "overlays": overlays}])
+    render_variants_ffmpeg(source_path, [{"output_path": ffmpeg_path, "overlays": overlays}])
+
+    # Only the text's bounding box is compared; over the whole frame a missing overlay is lost in the noise
+    with VideoFileClip(source_path) as source:
+        placement = OverlayPlacement.from_overlay(overlays[0], source.size)
+        width, height = placement.raster.size
+        box = (placement.x, placement.y, placement.x + width, placement.y + height)
+        with VideoFileClip(moviepy_path) as expected, VideoFileClip(ffmpeg_path) as actual:
+            # Before, during and after the overlay window
+            for t in (0.5, 1.25, 1.75, 2.5):
+                original, wanted, got = source.get_frame(t), expected.get_frame(t), actual.get_frame(t)
+                assert _region_difference(wanted, got, box) <= 4.0, f"backends differ at t={t}"
+                if placement.is_playing(t):
+                    assert _region_difference(wanted, original, box) > 10.0, f"moviepy drew no text at t={t}"
+                    assert _region_difference(got, original, box) > 10.0, f"ffmpeg drew no text at t={t}"
+                else:
+                    assert _region_difference(got, original, box) <= 4.0, f"ffmpeg drew text at t={t}"
+
+
+def test_ffmpeg_backend_reencodes_audio_mp4_cannot_hold(tmp_path):
+    # .mov uploads often carry PCM, which the MP4 muxer rejects when stream-copied
+    source_path = str(tmp_path / "source.mov")
+    run_ffmpeg([
+        "-f", "lavfi", "-i", "testsrc=size=320x240:rate=24:duration=2",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=2",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "pcm_s16le", "-shortest",
+        source_path,
+    ])
+    overlays = [{
+        "text": "PCM", "font": FONT, "font_size": 30, "color": "#FFFFFF",
+        "relative_x": 0.1, "relative_y": 0.4, "start_time": 0.5, "duration": 1.0,
+    }]
+    output_path = str(tmp_path / "output.mp4")
+    render_variants_ffmpeg(source_path, [{"output_path": output_path, "overlays": overlays}])
+
+    with VideoFileClip(output_path) as output:
+        assert output.audio is not None
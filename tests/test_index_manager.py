@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from benchmarks.fakes import HashEmbeddings  # noqa: E402
+from ragbot.index_manager import IndexManager  # noqa: E402
+
+
+def _documents(ids, changed=()):
+    for index in ids:
+        suffix = " revised" if index in changed else ""
+        text = f"alpha{index} beta{index} gamma{index} delta{index}{suffix}"
+        yield f"doc{index}", text, {"url": f"https://example.com/{index}", "title": f"Doc {index}"}
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "ivfpq", "hnsw"])
+def test_resync_after_deletes_keeps_search_consistent(tmp_path, index_type):
+    embeddings = HashEmbeddings(dim=64)
+    index_params = {"nlist": 4, "pq_m": 8} if index_type in ("ivf", "ivfpq") else {}
+    manager = IndexManager(
+        str(tmp_path), embeddings, "hash-64", chunk_size=1000, chunk_overlap=0, embed_workers=1,
+        index_type=index_type, index_params=index_params, train_size=1, nprobe=4,
+    )
+
+    manager.sync(_documents(range(120)))
+    # Drop the first ten, change one, add one: deletions land in the middle of the positional ids
+    db = manager.sync(_documents([*range(10, 120), 120], changed={50}))
+    # And again on top of the rebuilt index, so labels added after a delete are checked too
+    db = manager.sync(_documents([*range(20, 120), 120, 121], changed={50, 60}))
+
+    current = {*range(20, 122)}
+    assert db.index.ntotal == len(db.index_to_docstore_id) == len(current)
+
+    urls = {f"https://example.com/{index}" for index in current}
+    for _, text, metadata in _documents(sorted(current), changed={50, 60}):
+        found = db.similarity_search_by_vector(embeddings.embed_query(text), k=3)
+        # Every hit maps to a live document; a stale label would raise or return a deleted one
+        assert {document.metadata["url"] for document in found} <= urls
+        if index_type != "ivfpq":
+            # Exact vectors (and nprobe covering every list) find each document as its own nearest neighbour
+            assert found[0].metadata["url"] == metadata["url"]
+            assert found[0].page_content == text
+
+
+def test_sync_throughput_counts_only_embedded_documents(tmp_path):
+    manager = IndexManager(
+        str(tmp_path), HashEmbeddings(dim=64), "hash-64", chunk_size=1000, chunk_overlap=0, embed_workers=1,
+    )
+    manager.sync(_documents(range(50)))
+    assert manager.last_sync["embedded_documents"] == manager.last_sync["embedded_chunks"] == 50
+
+    # Forty-nine pages are only hashed; the rate must not credit them as ingested
+    manager.sync(_documents(range(50), changed={7}))
+    sync = manager.last_sync
+    assert sync["documents"] == 50 and sync["embedded_documents"] == 1
+    assert sync["embedded_docs_per_second"] == pytest.approx(1 / sync["seconds"])
+    assert sync["chunks_per_second"] == pytest.approx(sync["embedded_chunks"] / sync["seconds"])
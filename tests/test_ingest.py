@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from ragbot.ingest import iter_json_array
+
+ITEMS = [1, 23, 456, -7.5, 1e5, 12.25e-3, True, None, "text, with ] inside", {"url": "https://example.com", "n": 42}, [0]]
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 5, 7, 1 << 20])
+def test_iter_json_array_survives_any_block_boundary(tmp_path, read_size):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(ITEMS), encoding="utf-8")
+
+    assert list(iter_json_array(str(path), read_size=read_size)) == ITEMS
+
+
+def test_iter_json_array_splits_numbers_at_the_end_of_a_block(tmp_path):
+    path = tmp_path / "numbers.json"
+    path.write_text("[1, 23, 456]", encoding="utf-8")
+
+    assert list(iter_json_array(str(path), read_size=2)) == [1, 23, 456]
+
+
+def test_iter_json_array_rejects_an_unclosed_array(tmp_path):
+    path = tmp_path / "unclosed.json"
+    path.write_text("[1, 2", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), read_size=2))
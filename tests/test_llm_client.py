@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from benchmarks.fakes import FakeLLMServer  # noqa: E402
+from ragbot.llm_client import InflightCoalescer, StreamingLLMClient, sse_stream  # noqa: E402
+
+
+@pytest.fixture
+def fake_llm():
+    server = FakeLLMServer()
+    yield server
+    server.close()
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_sse_events_arrive_in_order_and_end_with_done(fake_llm):
+    async def run():
+        client = StreamingLLMClient(fake_llm.url)
+        try:
+            return [event async for event in sse_stream(client.stream("prompt"), lambda answer: {"answer": answer})]
+        finally:
+            await client.aclose()
+
+    events = _parse_sse("".join(asyncio.run(run())))
+
+    assert [data["token"] for kind, data in events[:-1] if kind == "message"] == fake_llm.tokens
+    assert events[-1] == ("done", {"answer": "Hello world!"})
+    assert sum(kind in ("done", "error") for kind, _ in events) == 1
+
+
+def test_sse_stream_ends_with_error_event_when_upstream_fails():
+    async def failing():
+        yield "partial"
+        raise RuntimeError("LLM endpoint returned 503")
+
+    async def run():
+        return [event async for event in sse_stream(failing(), lambda answer: {"answer": answer})]
+
+    events = _parse_sse("".join(asyncio.run(run())))
+
+    assert events == [("message", {"token": "partial"}), ("error", {"error": "LLM endpoint returned 503"})]
+
+
+def test_identical_concurrent_prompts_share_one_upstream_call(fake_llm):
+    async def run():
+        client = StreamingLLMClient(fake_llm.url)
+        coalescer = InflightCoalescer()
+        try:
+            answers = await asyncio.gather(
+                *(coalescer.collect("same prompt", lambda: client.stream("same prompt")) for _ in range(5))
+            )
+        finally:
+            await client.aclose()
+        return answers, coalescer.stats()
+
+    answers, stats = asyncio.run(run())
+
+    assert answers == ["Hello world!"] * 5
+    assert fake_llm.requests == 1
+    assert stats["started"] == 1 and stats["coalesced"] == 4
+
+
+def test_client_caps_concurrent_generations(fake_llm):
+    fake_llm.token_delay = 0.05
+
+    async def run():
+        client = StreamingLLMClient(fake_llm.url, max_concurrency=2)
+
+        async def answer(prompt):
+            return "".join([token async for token in client.stream(prompt)])
+
+        try:
+            return await asyncio.gather(*(answer(f"prompt {index}") for index in range(6)))
+        finally:
+            await client.aclose()
+
+    answers = asyncio.run(run())
+
+    assert answers == ["Hello world!"] * 6
+    assert fake_llm.requests == 6
+    assert fake_llm.max_active == 2
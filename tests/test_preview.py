@@ -0,0 +1,53 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("moviepy")
+psutil = pytest.importorskip("psutil")
+
+from moviepy.config import FFMPEG_BINARY  # noqa: E402
+
+from videopluxtext.media import make_test_video  # noqa: E402
+from videopluxtext.preview import PreviewRenderer  # noqa: E402
+
+FONT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fonts", "NotoSans-VariableFont_wdth,wght.ttf")
+
+pytestmark = [
+    pytest.mark.skipif(not (os.path.exists(FFMPEG_BINARY) or shutil.which(FFMPEG_BINARY)), reason="ffmpeg not found"),
+    pytest.mark.skipif(not os.path.exists(FONT), reason="font not found"),
+]
+
+
+def _overlays(start_time):
+    return [{
+        "text": "Preview", "font": FONT, "font_size": 30, "color": "#FFFFFF",
+        "relative_x": 0.1, "relative_y": 0.4, "start_time": start_time, "duration": 1.0,
+    }]
+
+
+def test_preview_clips_are_pruned_as_they_are_written(tmp_path):
+    source_path = make_test_video(str(tmp_path / "source.mp4"))
+    preview_dir = tmp_path / "previews"
+    renderer = PreviewRenderer(str(preview_dir), max_width=160, max_age_seconds=0)
+
+    paths = [renderer.preview_clip(source_path, _overlays(start), start, seconds=0.5) for start in (0.5, 1.0, 1.5)]
+
+    # Only the clip just handed out survives; every earlier slider position has been evicted
+    assert os.listdir(preview_dir) == [os.path.basename(paths[-1])]
+
+
+def test_preview_keeps_no_reader_open_on_the_source(tmp_path):
+    source_path = make_test_video(str(tmp_path / "source.mp4"))
+    renderer = PreviewRenderer(str(tmp_path / "previews"), max_width=160)
+
+    renderer.preview_frame(source_path, _overlays(1.0), 1.0)
+    # The reader's ffmpeg process is gone as soon as the frame is decoded
+    assert not [child for child in psutil.Process().children() if child.is_running()]
+    # Released uploads are deleted straight away; on Windows an open reader would make this fail
+    os.remove(source_path)
+    # Cached frames are still served after the source is gone
+    frame = renderer.preview_frame(source_path, _overlays(1.0), 1.0)
+    assert frame.shape[1] == 160
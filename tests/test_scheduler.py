@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("moviepy")
+pytest.importorskip("psutil")
+
+from moviepy.config import FFMPEG_BINARY  # noqa: E402
+
+from videopluxtext.media import make_test_video  # noqa: E402
+from videopluxtext.scheduler import RenderScheduler  # noqa: E402
+
+FONT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fonts", "NotoSans-VariableFont_wdth,wght.ttf")
+
+pytestmark = [
+    pytest.mark.skipif(not (os.path.exists(FFMPEG_BINARY) or shutil.which(FFMPEG_BINARY)), reason="ffmpeg not found"),
+    pytest.mark.skipif(not os.path.exists(FONT), reason="font not found"),
+]
+
+
+class RecordProgress:
+    # Workers get pickled copies, so only the calls made in the parent end up in ``calls``
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, group, frames_done, frames_total):
+        self.calls.append((group, frames_done, frames_total))
+
+
+def test_run_reports_every_group_before_rendering_and_yields_each_variant(tmp_path):
+    source_path = make_test_video(str(tmp_path / "source.mp4"), duration=1)
+    variants = [
+        {
+            "output_path": str(tmp_path / f"variant{index}.mp4"),
+            "overlays": [{
+                "text": f"Variant {index}", "font": FONT, "font_size": 24, "color": "#FFFFFF",
+                "relative_x": 0.1, "relative_y": 0.4, "start_time": 0.2, "duration": 0.5,
+            }],
+        }
+        for index in range(3)
+    ]
+    progress = RecordProgress()
+
+    scheduler = RenderScheduler(core_budget=2, max_workers=2, memory_per_worker_mb=1)
+    done = list(scheduler.run(source_path, variants, progress=progress, frames_total=24))
+
+    # Three variants in two groups: each group decodes once, and the bar's total covers both from the start
+    assert progress.calls == [(0, 0, 24), (1, 0, 24)]
+    assert sorted(variant["output_path"] for variant in done) == sorted(variant["output_path"] for variant in variants)
+    assert all(os.path.getsize(variant["output_path"]) > 0 for variant in variants)
@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("moviepy")
+
+from moviepy.config import FFMPEG_BINARY  # noqa: E402
+
+from videopluxtext.media import FFPROBE_BINARY, probe_video, run_ffmpeg, run_ffprobe  # noqa: E402
+from videopluxtext.smart_render import render_variants_partial  # noqa: E402
+
+FONT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fonts", "NotoSans-VariableFont_wdth,wght.ttf")
+
+pytestmark = [
+    pytest.mark.skipif(not (os.path.exists(FFMPEG_BINARY) or shutil.which(FFMPEG_BINARY)), reason="ffmpeg not found"),
+    pytest.mark.skipif(FFPROBE_BINARY is None, reason="ffprobe not found"),
+    pytest.mark.skipif(not os.path.exists(FONT), reason="font not found"),
+]
+
+
+def _frame_count(path):
+    return int(run_ffprobe([
+        "-select_streams", "v:0", "-count_packets", "-show_entries", "stream=nb_read_packets", "-of", "csv=p=0", path,
+    ]).strip())
+
+
+def test_partial_render_of_a_source_that_starts_late_keeps_every_frame(tmp_path):
+    # Streams cut from longer recordings often start well after zero
+    source_path = str(tmp_path / "source.mp4")
+    run_ffmpeg([
+        "-f", "lavfi", "-i", "testsrc=size=320x240:rate=24:duration=4",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", "24", "-output_ts_offset", "1.5",
+        source_path,
+    ])
+    assert probe_video(source_path)["start_time"] > 1.0
+
+    output_path = str(tmp_path / "output.mp4")
+    overlays = [{
+        "text": "Seam", "font": FONT, "font_size": 30, "color": "#FFFFFF",
+        "relative_x": 0.1, "relative_y": 0.4, "start_time": 1.2, "duration": 0.6,
+    }]
+    render_variants_partial(source_path, [{"output_path": output_path, "overlays": overlays}])
+
+    # Cuts misaligned by the start offset duplicate or drop a second and a half of frames at each seam
+    assert abs(_frame_count(output_path) - _frame_count(source_path)) <= 1
@@ -0,0 +1,50 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("moviepy")
+
+from videopluxtext.uploads import UploadManager  # noqa: E402
+
+
+class _Upload:
+    # The parts of Streamlit's UploadedFile that the manager reads
+
+    def __init__(self, data, name="clip.mp4", file_id="upload-1"):
+        self.data = data
+        self.name = name
+        self.file_id = file_id
+
+    def getbuffer(self):
+        return memoryview(self.data)
+
+
+def test_cleanup_expires_owners_that_never_release(tmp_path):
+    manager = UploadManager(root=str(tmp_path), max_age_seconds=0.2)
+    digest, path = manager.spool(_Upload(b"video bytes"))
+    manager.acquire(digest, "closed-tab")
+    manager.acquire(digest, "open-tab")
+
+    time.sleep(0.3)
+    # The open tab reruns and renews its reference; the closed one never comes back
+    manager.acquire(digest, "open-tab")
+    os.utime(path, (0, 0))
+    manager.cleanup()
+    assert os.path.exists(path)
+
+    time.sleep(0.3)
+    manager.cleanup()
+    assert not os.path.exists(path)
+
+
+def test_release_of_last_owner_removes_spool(tmp_path):
+    manager = UploadManager(root=str(tmp_path))
+    digest, path = manager.spool(_Upload(b"video bytes"))
+    manager.acquire(digest, "a")
+    manager.acquire(digest, "b")
+
+    manager.release(digest, "a")
+    assert os.path.exists(path)
+    manager.release(digest, "b")
+    assert not os.path.exists(path)
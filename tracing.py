@@ -0,0 +1,145 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram every stage is recorded into
+buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Stage:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(buckets) + 1)
+
+    def add(self, seconds, count=1):
+        self.count += count
+        self.total += seconds
+        # Aggregated records (count > 1) are bucketed by their mean
+        mean = seconds / count if count else 0.0
+        self.max = max(self.max, mean)
+        position = next((index for index, bound in enumerate(buckets) if mean <= bound), len(buckets))
+        self.buckets[position] += count
+
+
+class Tracer:
+    """Process-wide per-stage timings and event counters.
+
+    ``span(name)`` times a block; ``count(name)`` bumps a counter. Everything is kept as
+    running totals plus a fixed latency histogram, so recording costs a lock and a few
+    additions and memory does not grow with traffic. ``snapshot()`` is plain data that can
+    cross a process boundary and be folded into another tracer with ``merge()``.
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, name, seconds, count=1):
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = _Stage()
+            stage.add(seconds, count)
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed_iter(self, name, iterable):
+        # Charges the time spent producing each item (a decoder, a reader) to ``name``
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, time.perf_counter() - started)
+            yield item
+
+    def count(self, name, value=1):
+        # Exported as Prometheus counters, which may only go up
+        if value < 0:
+            raise ValueError(f"Counter {name} cannot be decreased (got {value})")
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {
+                    name: {"count": stage.count, "total": stage.total, "max": stage.max, "buckets": list(stage.buckets)}
+                    for name, stage in self._stages.items()
+                },
+                "counters": dict(self._counters),
+            }
+
+    def merge(self, snapshot):
+        with self._lock:
+            for name, recorded in snapshot["stages"].items():
+                stage = self._stages.get(name)
+                if stage is None:
+                    stage = self._stages[name] = _Stage()
+                stage.count += recorded["count"]
+                stage.total += recorded["total"]
+                stage.max = max(stage.max, recorded["max"])
+                stage.buckets = [mine + theirs for mine, theirs in zip(stage.buckets, recorded["buckets"])]
+            for name, value in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def summary(self):
+        """One row per stage, slowest total first, for tables and diagnostics panels."""
+        snapshot = self.snapshot()
+        rows = [
+            {
+                "stage": name,
+                "count": stage["count"],
+                "total_s": round(stage["total"], 4),
+                "mean_ms": round(1000 * stage["total"] / stage["count"], 3) if stage["count"] else 0.0,
+                "max_ms": round(1000 * stage["max"], 3),
+            }
+            for name, stage in snapshot["stages"].items()
+        ]
+        rows.sort(key=lambda row: row["total_s"], reverse=True)
+        return rows, snapshot["counters"]
+
+    def prometheus(self, prefix="app"):
+        """Render everything in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, stage in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, observed in zip((*buckets, "+Inf"), stage["buckets"]):
+                cumulative += observed
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stage["total"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+        lines += [f"# HELP {prefix}_events_total Pipeline event counters.", f"# TYPE {prefix}_events_total counter"]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+tracer = Tracer()
+span = tracer.span
+count = tracer.count
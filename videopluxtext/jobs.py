@@ -0,0 +1,330 @@
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from tracing import count, span, tracer
+from videopluxtext.media import probe_video
+from videopluxtext.media_server import prune_renders
+from videopluxtext.scheduler import RenderScheduler
+
+
+def _connect(db_path):
+    # WAL lets the render worker processes report progress while the app reads job state
+    connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    return connection
+
+
+class JobStore:
+    """SQLite record of render jobs: their request, stage, per-worker frame progress and finished outputs."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Streamlit sessions and job workers share this connection, so all access goes through self._lock
+        self._lock = threading.Lock()
+        self._connection = _connect(db_path)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                video_digest TEXT NOT NULL,
+                video_path TEXT NOT NULL,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                outputs TEXT NOT NULL,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, created)")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_progress (
+                job_id TEXT NOT NULL,
+                worker INTEGER NOT NULL,
+                frames_done INTEGER NOT NULL,
+                frames_total INTEGER NOT NULL,
+                PRIMARY KEY (job_id, worker)
+            )
+            """
+        )
+        self._connection.commit()
+
+    def create(self, owner, video_digest, video_path, request):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO jobs (id, owner, video_digest, video_path, request, status, stage, outputs, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', 'queued', '[]', ?, ?)",
+                (job_id, owner, video_digest, video_path, json.dumps(request), now, now),
+            )
+            self._connection.commit()
+        return job_id
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._connection.execute(
+                f"UPDATE jobs SET {assignments}, updated = ? WHERE id = ?",
+                (*fields.values(), time.time(), job_id),
+            )
+            self._connection.commit()
+
+    def set_stage(self, job_id, stage, status="running"):
+        self._update(job_id, status=status, stage=stage)
+
+    def add_output(self, job_id, output):
+        with self._lock:
+            row = self._connection.execute("SELECT outputs FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            outputs = json.loads(row[0]) + [output]
+            self._connection.execute(
+                "UPDATE jobs SET outputs = ?, updated = ? WHERE id = ?", (json.dumps(outputs), time.time(), job_id)
+            )
+            self._connection.commit()
+
+    def finish(self, job_id):
+        self._update(job_id, status="done", stage="done")
+
+    def fail(self, job_id, error):
+        self._update(job_id, status="failed", stage="failed", error=error)
+
+    def recover(self):
+        """Requeue jobs that were running when the process stopped, and return every queued job id in order."""
+        with self._lock:
+            running = [row[0] for row in self._connection.execute("SELECT id FROM jobs WHERE status = 'running'")]
+            for job_id in running:
+                # Partial outputs and progress are from the interrupted attempt, which starts over
+                self._connection.execute(
+                    "UPDATE jobs SET status = 'queued', stage = 'queued', outputs = '[]', updated = ? WHERE id = ?",
+                    (time.time(), job_id),
+                )
+                self._connection.execute("DELETE FROM job_progress WHERE job_id = ?", (job_id,))
+            self._connection.commit()
+            return [
+                row[0]
+                for row in self._connection.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created")
+            ]
+
+    def in_use(self, video_path):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE video_path = ? AND status IN ('queued', 'running')", (video_path,)
+            ).fetchone()
+        return row[0] > 0
+
+    def active_ids(self, grace_seconds=0):
+        """Ids of jobs that are queued or running, or that finished less than ``grace_seconds`` ago."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') OR updated >= ?",
+                (time.time() - grace_seconds,),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def _row_to_job(self, row):
+        job_id, owner, video_digest, video_path, request, status, stage, outputs, error, created, updated = row
+        progress = self._connection.execute(
+            "SELECT COALESCE(SUM(frames_done), 0), COALESCE(SUM(frames_total), 0) FROM job_progress WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        return {
+            "id": job_id,
+            "owner": owner,
+            "video_digest": video_digest,
+            "video_path": video_path,
+            "request": json.loads(request),
+            "status": status,
+            "stage": stage,
+            "outputs": json.loads(outputs),
+            "error": error,
+            "created": created,
+            "updated": updated,
+            "frames_done": progress[0],
+            "frames_total": progress[1],
+        }
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row) if row else None
+
+    def list(self, owner, limit=20):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT * FROM jobs WHERE owner = ? ORDER BY created DESC LIMIT ?", (owner, limit)
+            ).fetchall()
+            return [self._row_to_job(row) for row in rows]
+
+
+class JobProgress:
+    """Picklable frame-progress callback for render workers; each process writes through its own connection.
+
+    Writes are throttled to one every ``interval`` seconds per worker, plus the final frame.
+    """
+
+    def __init__(self, db_path, job_id, interval=0.5):
+        self.db_path = db_path
+        self.job_id = job_id
+        self.interval = interval
+        self._connection = None
+        self._last_write = {}
+
+    def __getstate__(self):
+        return {"db_path": self.db_path, "job_id": self.job_id, "interval": self.interval}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __call__(self, worker, frames_done, frames_total):
+        now = time.monotonic()
+        if frames_done < frames_total and now - self._last_write.get(worker, 0.0) < self.interval:
+            return
+        self._last_write[worker] = now
+
+        if self._connection is None:
+            self._connection = _connect(self.db_path)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO job_progress (job_id, worker, frames_done, frames_total) VALUES (?, ?, ?, ?)",
+            (self.job_id, worker, frames_done, frames_total),
+        )
+        self._connection.commit()
+
+
+class RenderJobQueue:
+    """Runs "Process Video" requests as background jobs on a small pool of worker threads.
+
+    A job carries the upload's content hash, the overlay configuration and the language
+    tuples. Workers translate, then render through the RenderScheduler and record each
+    finished variant as it lands, so a browser refresh or another user's script run
+    never interrupts a render. Jobs that were queued or running when the server stopped
+    are picked up again on start.
+    """
+
+    def __init__(self, store, translate_many, font_map, render_dir, source_dir, workers=1):
+        self.store = store
+        # translate_many(texts, languages) -> translations, in order
+        self.translate_many = translate_many
+        self.font_map = font_map
+        self.render_dir = render_dir
+        self.source_dir = source_dir
+        self.workers = workers
+        self._queue = queue.Queue()
+        # Held while a source copy is created or removed, so a finishing job never deletes one being submitted
+        self._sources_lock = threading.Lock()
+        os.makedirs(self.render_dir, exist_ok=True)
+        os.makedirs(self.source_dir, exist_ok=True)
+
+        for job_id in self.store.recover():
+            self._queue.put(job_id)
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f"render-job-{index}", daemon=True) for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _keep_source(self, video_digest, video_path):
+        # Jobs hold their own copy of the upload, which outlives the session that spooled it
+        path = os.path.join(self.source_dir, video_digest + os.path.splitext(video_path)[1])
+        if not os.path.exists(path):
+            partial_path = path + ".part"
+            try:
+                os.link(video_path, partial_path)
+            except OSError:
+                shutil.copyfile(video_path, partial_path)
+            os.replace(partial_path, path)
+        return path
+
+    def prune_outputs(self, max_age_seconds, max_total_bytes, grace_seconds=15 * 60):
+        """Evict old renders, but never the outputs of queued or running jobs or of ones that just finished."""
+        active = self.store.active_ids(grace_seconds)
+
+        def keep(path):
+            # Outputs are named "<video digest>_<job id>_<languages>.mp4"
+            parts = os.path.basename(path).split("_")
+            return len(parts) > 1 and parts[1] in active
+
+        return prune_renders(self.render_dir, max_age_seconds, max_total_bytes, keep=keep)
+
+    def submit(self, owner, video_digest, video_path, overlays, language_tuples, mode="full", backend="moviepy"):
+        request = {
+            "overlays": overlays,
+            "language_tuples": [list(langs) for langs in language_tuples],
+            "mode": mode,
+            "backend": backend,
+        }
+        with self._sources_lock:
+            job_id = self.store.create(owner, video_digest, self._keep_source(video_digest, video_path), request)
+        self._queue.put(job_id)
+        return job_id
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        if job is None or job["status"] != "queued":
+            return
+        request = job["request"]
+        overlays = request["overlays"]
+        tracer.record("job.queue_wait", max(time.time() - job["created"], 0.0))
+
+        try:
+            # Every (text, language) pair of the job goes through the translation service in one call
+            self.store.set_stage(job_id, "translating")
+            pairs = [(overlays[idx]["text"], lang) for langs in request["language_tuples"] for idx, lang in enumerate(langs)]
+            with span("job.translate"):
+                translations = self.translate_many([text for text, _ in pairs], [lang for _, lang in pairs])
+            translated = dict(zip(pairs, translations))
+
+            variants = []
+            for langs in request["language_tuples"]:
+                variant_overlays = [
+                    {**overlays[idx], "text": translated[(overlays[idx]["text"], lang)], "font": self.font_map.get(lang)}
+                    for idx, lang in enumerate(langs)
+                ]
+                output_path = os.path.join(self.render_dir, f"{job['video_digest']}_{job_id}_{'_'.join(langs)}.mp4")
+                variants.append({"langs": langs, "output_path": output_path, "overlays": variant_overlays})
+
+            self.store.set_stage(job_id, "rendering")
+            # Concurrent jobs split the core budget between them
+            scheduler = RenderScheduler.from_env()
+            scheduler.core_budget = max(1, scheduler.core_budget // self.workers)
+            # Full renders resample to 24 fps, partial ones keep the source rate
+            info = probe_video(job["video_path"])
+            fps = 24 if request["mode"] == "full" else info["fps"] or 24
+            with span("job.render"):
+                for variant in scheduler.run(
+                    job["video_path"], variants, fps=24, codec="libx264", audio_codec="aac",
+                    mode=request["mode"], backend=request["backend"], progress=JobProgress(self.store.db_path, job_id),
+                    frames_total=int(info["duration"] * fps),
+                ):
+                    self.store.add_output(job_id, {"langs": variant["langs"], "output_path": variant["output_path"]})
+            self.store.finish(job_id)
+            count("job.done")
+        except Exception as e:
+            self.store.fail(job_id, str(e))
+            count("job.failed")
+        finally:
+            with self._sources_lock:
+                if not self.store.in_use(job["video_path"]) and os.path.exists(job["video_path"]):
+                    os.remove(job["video_path"])
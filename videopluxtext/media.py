@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from fractions import Fraction
+
+from moviepy.config import FFMPEG_BINARY
+
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY") or shutil.which("ffprobe")
+
+# Audio codecs the MP4 muxer carries as-is; anything else (PCM from .mov/.avi, say) has to be re-encoded
+mp4_audio_codecs = {"aac", "mp3", "ac3", "eac3", "alac"}
+
+
+def run_ffmpeg(args, on_frame=None):
+    command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y", *args]
+    if on_frame is None:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+        return
+
+    # Machine-readable progress on stdout; errors still go to stderr, which a temp file drains
+    command[1:1] = ["-progress", "pipe:1", "-nostats"]
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+        for line in process.stdout:
+            key, _, value = line.decode(errors="replace").strip().partition("=")
+            if key == "frame" and value.isdigit():
+                on_frame(int(value))
+        process.stdout.close()
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read().decode(errors='replace').strip()}")
+
+
+def make_test_video(path, width=320, height=240, fps=24, duration=3, gop=None):
+    # A synthetic H.264/AAC clip from ffmpeg's own test sources, for parity checks and benchmarks
+    args = [
+        "-f", "lavfi", "-i", f"testsrc=size={width}x{height}:rate={fps}:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p",
+    ]
+    if gop:
+        args += ["-g", str(gop)]
+    run_ffmpeg([*args, "-c:a", "aac", "-shortest", path])
+    return path
+
+
+def run_ffprobe(args):
+    if FFPROBE_BINARY is None:
+        raise RuntimeError("ffprobe was not found. Install ffmpeg or set FFPROBE_BINARY.")
+
+    command = [FFPROBE_BINARY, "-v", "error", *args]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout.decode()
+
+
+def audio_output_args(info, audio_codec="aac"):
+    # Copy the source audio when MP4 can hold it, otherwise encode it like the moviepy path does.
+    # An unknown codec (no ffprobe) is re-encoded too, since a failed mux costs the whole render.
+    if info["audio_codec"] in mp4_audio_codecs:
+        return ["-c:a", "copy"]
+    return ["-c:a", audio_codec]
+
+
+def probe_video(path):
+    # Reads container and stream headers only, no frames are decoded
+    if FFPROBE_BINARY is None:
+        return _probe_video_with_ffmpeg(path)
+
+    info = json.loads(run_ffprobe(["-show_format", "-show_streams", "-of", "json", path]))
+    video = next(stream for stream in info["streams"] if stream["codec_type"] == "video")
+    audio = next((stream for stream in info["streams"] if stream["codec_type"] == "audio"), None)
+
+    return {
+        "duration": float(info["format"].get("duration") or video.get("duration") or 0.0),
+        "fps": float(Fraction(video.get("avg_frame_rate") or video.get("r_frame_rate") or "0/1") or 0),
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "codec": video.get("codec_name"),
+        "profile": video.get("profile"),
+        "level": video.get("level"),
+        "pix_fmt": video.get("pix_fmt"),
+        "has_b_frames": int(video.get("has_b_frames") or 0),
+        "time_base": video.get("time_base"),
+        "start_time": float(video.get("start_time") or 0.0),
+        "audio_codec": audio.get("codec_name") if audio else None,
+    }
+
+
+def _probe_video_with_ffmpeg(path):
+    # Without ffprobe, fall back to moviepy's parser of the "ffmpeg -i" header dump
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+    infos = ffmpeg_parse_infos(path)
+    width, height = infos.get("video_size") or (0, 0)
+    return {
+        "duration": float(infos.get("duration") or 0.0),
+        "fps": float(infos.get("video_fps") or 0.0),
+        "width": int(width),
+        "height": int(height),
+        "codec": infos.get("video_codec_name"),
+        "profile": None,
+        "level": None,
+        "pix_fmt": None,
+        "has_b_frames": None,
+        "time_base": None,
+        "start_time": float(infos.get("start") or 0.0),
+        "audio_codec": None,
+    }
+
+
+def probe_keyframes(path):
+    # Packet flags come straight from the container index, so this does not decode anything either
+    output = run_ffprobe([
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        path,
+    ])
+
+    keyframes = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
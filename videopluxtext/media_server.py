@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+_range_pattern = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    # Serves rendered videos straight from disk, with HTTP range support so the player can seek
+
+    served_extensions = {".mp4": "video/mp4"}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self):
+        parts = urlsplit(self.path)
+        relative_path = unquote(parts.path).lstrip("/")
+        root = os.path.realpath(self.directory)
+        path = os.path.realpath(os.path.join(root, relative_path))
+
+        # Never serve anything outside the render directory or of an unexpected type
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+            return None, None
+        if os.path.splitext(path)[1].lower() not in self.served_extensions:
+            return None, None
+        return path, parse_qs(parts.query)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        path, query = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+
+        header = self.headers.get("Range")
+        if header:
+            match = _range_pattern.match(header.strip())
+            if match is None or (not match.group(1) and not match.group(2)):
+                self.send_error(416)
+                return
+            if match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            else:
+                # Suffix range: the last N bytes
+                start = max(size - int(match.group(2)), 0)
+            if start > end or start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            status = 206
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header("Content-Type", self.served_extensions[os.path.splitext(path)[1].lower()])
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(length))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        if "download" in query:
+            self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+        self.end_headers()
+
+        if send_body:
+            # socket.sendfile hands the copy to the kernel where the platform supports it
+            with open(path, "rb") as f:
+                try:
+                    self.connection.sendfile(f, offset=start, count=length)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+
+class MediaServer:
+    """Background HTTP server for finished renders, so outputs never pass through Streamlit's memory."""
+
+    def __init__(self, directory, host="127.0.0.1", port=8502, public_url=None):
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self.public_url = (public_url or f"http://localhost:{port}").rstrip("/")
+        self._server = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        directory = self.directory
+
+        class Handler(RangeRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="media-server", daemon=True).start()
+        return self
+
+    def url_for(self, path, download=False):
+        relative_path = os.path.relpath(path, self.directory).replace(os.sep, "/")
+        url = f"{self.public_url}/{quote(relative_path)}"
+        return url + "?download=1" if download else url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def prune_renders(directory, max_age_seconds=24 * 3600, max_total_bytes=20 * 1024 ** 3, keep=None):
+    """Evict renders older than max_age_seconds, then the oldest ones until under max_total_bytes.
+
+    Files for which ``keep(path)`` is true are never removed, though they still count towards the total.
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    now = time.time()
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+
+    removed = []
+    total = sum(size for _, size, _ in entries)
+    for modified, size, path in entries:
+        if now - modified <= max_age_seconds and total <= max_total_bytes:
+            break
+        if keep is not None and keep(path):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed.append(path)
+    return removed
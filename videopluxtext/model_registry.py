@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+import time
+
+import psutil
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+logger = logging.getLogger(__name__)
+
+onnx_export_root = os.getenv("TRANSLATION_ONNX_DIR", "videopluxtext/cache/onnx")
+
+
+def _load_torch(dtype):
+    def load(model_path):
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_path, torch_dtype=dtype)
+        return model.eval()
+    return load
+
+
+def _load_torch_int8(model_path):
+    # Dynamic quantization: int8 weights for every Linear layer, activations quantized on the fly
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_path, torch_dtype=torch.float32).eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_onnx(model_path):
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as error:
+        raise ImportError(
+            "The onnx backend needs optimum with ONNX Runtime. Install it with: pip install optimum[onnxruntime]"
+        ) from error
+
+    # Export once per snapshot and reuse the saved graph on later starts
+    export_dir = os.path.join(onnx_export_root, os.path.basename(model_path.rstrip("/")))
+    if os.path.isdir(export_dir):
+        return ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_path, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+
+# Inference backends selectable per TranslateMassage, all exposed through the same pipeline
+backends = {
+    "torch-fp32": _load_torch(torch.float32),
+    "torch-bf16": _load_torch(torch.bfloat16),
+    "torch-int8": _load_torch_int8,
+    "onnx": _load_onnx,
+}
+
+
+class ModelRegistry:
+    """Process-wide home of the translation pipelines, so each model is loaded exactly once."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pipelines = {}
+        self._loading = {}
+        self._errors = {}
+        self._warm_up_errors = {}
+        self._stats = {}
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def get(self, model_path, backend="torch-bf16"):
+        if backend not in backends:
+            raise ValueError(f"Unknown translation backend: {backend}. Choose one of {', '.join(backends)}.")
+
+        key = (model_path, backend)
+        with self._lock:
+            if key in self._pipelines:
+                return self._pipelines[key]
+
+            # A failed background load is reported to the first caller instead of being retried silently
+            warm_up_error = self._warm_up_errors.pop(key, None)
+            if warm_up_error is not None:
+                raise warm_up_error
+
+            # Whoever arrives first loads; everyone else waits on the same event
+            event = self._loading.get(key)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._loading[key] = event
+                self._errors.pop(key, None)
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                if key in self._errors:
+                    raise self._errors[key]
+                return self._pipelines[key]
+
+        try:
+            translator = self._load(model_path, backend)
+        except Exception as error:
+            with self._lock:
+                self._errors[key] = error
+                del self._loading[key]
+            event.set()
+            raise
+
+        with self._lock:
+            self._pipelines[key] = translator
+            del self._loading[key]
+        event.set()
+        return translator
+
+    def _load(self, model_path, backend):
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        started = time.perf_counter()
+
+        # One load from the local snapshot; the pipeline reuses this model and tokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        model = backends[backend](model_path)
+        translator = pipeline(task="translation", model=model, tokenizer=tokenizer)
+
+        rss_after = process.memory_info().rss
+        self._stats[(model_path, backend)] = {
+            "backend": backend,
+            "load_seconds": time.perf_counter() - started,
+            "model_rss_mb": (rss_after - rss_before) / (1024 * 1024),
+            "process_rss_mb": rss_after / (1024 * 1024),
+        }
+        return translator
+
+    def warm_up(self, model_path, backend="torch-bf16"):
+        # Load in the background at app start so the first "Process Video" click does not pay for it
+        def load():
+            try:
+                self.get(model_path, backend)
+            except Exception as error:
+                logger.exception("Warm-up of %s (%s) failed", model_path, backend)
+                with self._lock:
+                    self._warm_up_errors[key] = error
+
+        key = (model_path, backend)
+        with self._lock:
+            if key in self._pipelines or key in self._loading:
+                return
+        threading.Thread(target=load, name="model-warm-up", daemon=True).start()
+
+    def is_loaded(self, model_path, backend="torch-bf16"):
+        with self._lock:
+            return (model_path, backend) in self._pipelines
+
+    def stats(self, model_path=None, backend="torch-bf16"):
+        with self._lock:
+            if model_path is not None:
+                return dict(self._stats.get((model_path, backend), {}))
+            return {key: dict(values) for key, values in self._stats.items()}
@@ -0,0 +1,129 @@
+import math
+import textwrap
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from tracing import count, span
+
+
+class OverlayRaster:
+    # Pre-multiplied RGBA pixels of a text overlay, cropped to the glyphs' bounding box
+
+    def __init__(self, rgb, alpha, offset_x=0, offset_y=0):
+        alpha = alpha.astype(np.float32)[..., np.newaxis]
+        self.rgb = rgb[..., :3]
+        self.alpha = alpha
+        self.premultiplied = alpha * self.rgb.astype(np.float32)
+        self.inverse_alpha = 1.0 - alpha
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+    @property
+    def size(self):
+        return self.rgb.shape[1], self.rgb.shape[0]
+
+
+_raster_cache = OrderedDict()
+_raster_cache_lock = threading.Lock()
+raster_cache_size = 256
+
+
+def rasterize_text(text, font, font_size, color, wrap_width=70):
+    key = (text, font, font_size, color, wrap_width)
+    with _raster_cache_lock:
+        if key in _raster_cache:
+            _raster_cache.move_to_end(key)
+            count("render.raster_cache_hits")
+            return _raster_cache[key]
+
+    count("render.raster_cache_misses")
+    wrapped_text = "\n".join(textwrap.wrap(text, width=wrap_width))
+    with span("render.rasterize"):
+        # PIL draws the glyphs straight into RGBA, which every render backend and the preview share
+        pil_font = ImageFont.truetype(font, font_size)
+        _, _, right, bottom = ImageDraw.Draw(Image.new("RGBA", (1, 1))).multiline_textbbox(
+            (0, 0), wrapped_text, font=pil_font, align="center"
+        )
+        image = Image.new("RGBA", (max(math.ceil(right), 1), max(math.ceil(bottom), 1)), (0, 0, 0, 0))
+        ImageDraw.Draw(image).multiline_text((0, 0), wrapped_text, font=pil_font, fill=color, align="center")
+        pixels = np.asarray(image)
+        rgb = pixels[..., :3]
+        alpha = pixels[..., 3].astype(np.float32) / 255.0
+
+    # Crop away the fully transparent margin so blending only touches visible pixels
+    rows = np.flatnonzero(alpha.any(axis=1))
+    cols = np.flatnonzero(alpha.any(axis=0))
+    if rows.size and cols.size:
+        y0, y1 = rows[0], rows[-1] + 1
+        x0, x1 = cols[0], cols[-1] + 1
+        raster = OverlayRaster(rgb[y0:y1, x0:x1], alpha[y0:y1, x0:x1], offset_x=x0, offset_y=y0)
+    else:
+        raster = OverlayRaster(rgb[:0, :0], alpha[:0, :0])
+
+    with _raster_cache_lock:
+        _raster_cache[key] = raster
+        _raster_cache.move_to_end(key)
+        while len(_raster_cache) > raster_cache_size:
+            _raster_cache.popitem(last=False)
+
+    return raster
+
+
+class OverlayPlacement:
+    # A raster positioned on the frame, following moviepy's relative positioning, and its time window
+
+    def __init__(self, raster, frame_size, relative_x, relative_y, start_time, duration):
+        width, height = frame_size
+        self.raster = raster
+        self.x = int(relative_x * width) + raster.offset_x
+        self.y = int(relative_y * height) + raster.offset_y
+        self.start = start_time
+        self.end = start_time + duration
+
+    @classmethod
+    def from_overlay(cls, overlay, frame_size, wrap_width=70):
+        raster = rasterize_text(
+            overlay["text"], overlay["font"], overlay["font_size"], overlay["color"], wrap_width=wrap_width
+        )
+        return cls(
+            raster,
+            frame_size,
+            overlay["relative_x"],
+            overlay["relative_y"],
+            overlay["start_time"],
+            overlay["duration"],
+        )
+
+    def is_playing(self, t):
+        return self.start <= t < self.end
+
+    def blit(self, canvas):
+        height, width = canvas.shape[:2]
+        raster_width, raster_height = self.raster.size
+
+        # Clip the bounding box to the frame
+        x0, y0 = max(self.x, 0), max(self.y, 0)
+        x1, y1 = min(self.x + raster_width, width), min(self.y + raster_height, height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        rows = slice(y0 - self.y, y1 - self.y)
+        cols = slice(x0 - self.x, x1 - self.x)
+        region = canvas[y0:y1, x0:x1]
+        blended = self.raster.premultiplied[rows, cols] + self.raster.inverse_alpha[rows, cols] * region
+        region[...] = blended.astype(canvas.dtype)
+
+
+def composite_frame(frame, placements, t):
+    # Frames outside every overlay's window are returned untouched, without a copy
+    active = [placement for placement in placements if placement.is_playing(t)]
+    if not active:
+        return frame
+
+    canvas = frame.copy()
+    for placement in active:
+        placement.blit(canvas)
+    return canvas
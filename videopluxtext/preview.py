@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from moviepy.editor import VideoFileClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from PIL import Image
+
+from tracing import span
+from videopluxtext.media_server import prune_renders
+from videopluxtext.overlays import OverlayPlacement, composite_frame
+
+
+class PreviewRenderer:
+    """Low-resolution previews of an overlay layout, for positioning text without a full render.
+
+    Source frames are decoded once, downscaled to ``max_width`` and kept in an LRU, and
+    overlays are drawn through the shared raster cache at the proxy's scale, so moving a
+    slider only re-composites a small frame. Short proxy clips are encoded at a low frame
+    rate with the fastest x264 preset and reused while the layout is unchanged; after each
+    new clip, clips older than ``max_age_seconds`` or beyond ``max_total_bytes`` are pruned.
+    No reader is kept open between calls, so an upload can be deleted as soon as it is released.
+    """
+
+    def __init__(
+        self, preview_dir, max_width=480, max_frames=512, clip_fps=8, max_age_seconds=3600,
+        max_total_bytes=256 * 1024 ** 2,
+    ):
+        self.preview_dir = preview_dir
+        self.max_width = max_width
+        self.max_frames = max_frames
+        self.clip_fps = clip_fps
+        self.max_age_seconds = max_age_seconds
+        self.max_total_bytes = max_total_bytes
+        self._frames = OrderedDict()
+        # moviepy's frame reader keeps a position in its ffmpeg pipe, so decoding is serialized
+        self._lock = threading.Lock()
+        os.makedirs(self.preview_dir, exist_ok=True)
+
+    def frames(self, video_path, times):
+        """Return ``(frame, scale)`` for each of ``times``: the downscaled source frame and the scale it was reduced by.
+
+        Cache misses are decoded through one reader that is closed before returning.
+        """
+        keys = [(video_path, round(t, 3)) for t in times]
+        with self._lock:
+            missing = [key for key in dict.fromkeys(keys) if key not in self._frames]
+            if missing:
+                with VideoFileClip(video_path, audio=False) as clip:
+                    width, height = clip.size
+                    scale = min(1.0, self.max_width / width)
+                    last = max(clip.duration - 1 / (clip.fps or 24), 0.0)
+                    for key in missing:
+                        frame = clip.get_frame(min(max(key[1], 0.0), last))
+                        if scale < 1.0:
+                            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                            frame = np.asarray(Image.fromarray(frame).resize(size, Image.BILINEAR))
+                        self._frames[key] = (frame, scale)
+
+            results = []
+            for key in keys:
+                self._frames.move_to_end(key)
+                results.append(self._frames[key])
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+            return results
+
+    def frame(self, video_path, t):
+        """Return the downscaled source frame at ``t`` and the scale it was reduced by."""
+        return self.frames(video_path, [t])[0]
+
+    @staticmethod
+    def _placements(overlays, frame, scale):
+        # Relative positions carry over to the proxy as-is; only the text has to shrink with the frame
+        frame_size = (frame.shape[1], frame.shape[0])
+        return [
+            OverlayPlacement.from_overlay({**overlay, "font_size": max(1, round(overlay["font_size"] * scale))}, frame_size)
+            for overlay in overlays
+            if overlay["text"]
+        ]
+
+    def preview_frame(self, video_path, overlays, t):
+        with span("preview.frame"):
+            frame, scale = self.frame(video_path, t)
+            return composite_frame(frame, self._placements(overlays, frame, scale), t)
+
+    def preview_clip(self, video_path, overlays, start, seconds=2.0, lead_in=0.5):
+        """Encode a short proxy clip from just before ``start`` and return its path."""
+        clip_start = max(start - lead_in, 0.0)
+        layout = json.dumps([video_path, overlays, clip_start, seconds, self.max_width, self.clip_fps], sort_keys=True)
+        output_path = os.path.join(self.preview_dir, hashlib.sha256(layout.encode("utf-8")).hexdigest()[:24] + ".mp4")
+        if os.path.exists(output_path):
+            return output_path
+
+        with span("preview.clip"):
+            self._encode_clip(video_path, overlays, clip_start, seconds, output_path)
+        # Every slider position is a new file, so the directory is kept in check as it grows
+        prune_renders(
+            self.preview_dir, self.max_age_seconds, self.max_total_bytes, keep=lambda path: path == output_path
+        )
+        return output_path
+
+    def _encode_clip(self, video_path, overlays, clip_start, seconds, output_path):
+        times = [clip_start + index / self.clip_fps for index in range(int(seconds * self.clip_fps))]
+        frames = self.frames(video_path, times)
+        frame, scale = frames[0]
+        placements = self._placements(overlays, frame, scale)
+        # libx264 wants even dimensions
+        height, width = (frame.shape[0] // 2) * 2, (frame.shape[1] // 2) * 2
+
+        partial_path = output_path + ".part.mp4"
+        writer = FFMPEG_VideoWriter(partial_path, (width, height), self.clip_fps, codec="libx264", preset="ultrafast")
+        try:
+            for t, (frame, _) in zip(times, frames):
+                writer.write_frame(np.ascontiguousarray(composite_frame(frame, placements, t)[:height, :width]))
+        finally:
+            writer.close()
+        os.replace(partial_path, output_path)
@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+from moviepy.editor import VideoFileClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+from tracing import span, tracer
+from videopluxtext.overlays import OverlayPlacement, composite_frame
+
+
+def render_variants(video_path, variants, fps=24, codec="libx264", audio_codec="aac", threads=None, progress=None):
+    """Decode the source once and encode every variant from the same frames.
+
+    Each variant is a dict with an ``output_path`` and a list of ``overlays``
+    (text, font, font_size, color, relative_x, relative_y, start_time, duration).
+    ``progress``, if given, is called as ``progress(frames_done, frames_total)`` after every frame.
+    """
+    video = VideoFileClip(video_path)
+    audio_path = None
+    writers = []
+
+    try:
+        # Encode the soundtrack once and mux the same file into every output
+        if video.audio is not None:
+            audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".m4a")
+            audio_file.close()
+            audio_path = audio_file.name
+            with span("render.audio"):
+                video.audio.write_audiofile(audio_path, codec=audio_codec, logger=None)
+
+        # Text is rasterized once per distinct overlay and shared across variants
+        placements = [
+            [OverlayPlacement.from_overlay(overlay, video.size) for overlay in variant["overlays"]]
+            for variant in variants
+        ]
+
+        for variant in variants:
+            writers.append(
+                FFMPEG_VideoWriter(
+                    variant["output_path"],
+                    video.size,
+                    fps,
+                    codec=codec,
+                    audiofile=audio_path,
+                    threads=threads,
+                )
+            )
+
+        # Every encoder is its own ffmpeg process, so feeding them in turn keeps all of them busy
+        frames_total = int(video.duration * fps)
+        frames = tracer.timed_iter("render.decode", video.iter_frames(fps=fps, with_times=True, dtype="uint8"))
+        for index, (t, frame) in enumerate(frames, start=1):
+            for variant_placements, writer in zip(placements, writers):
+                with span("render.composite"):
+                    composited = composite_frame(frame, variant_placements, t)
+                # Writing blocks while the encoder is behind, so this is where encode time shows up
+                with span("render.encode"):
+                    writer.write_frame(composited)
+            if progress is not None:
+                progress(min(index, frames_total), frames_total)
+    finally:
+        for writer in writers:
+            writer.close()
+        video.close()
+        if audio_path is not None and os.path.exists(audio_path):
+            os.remove(audio_path)
+
+    return [variant["output_path"] for variant in variants]
@@ -0,0 +1,142 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import psutil
+
+from tracing import span, tracer
+from videopluxtext.ffmpeg_backend import render_variants_ffmpeg
+from videopluxtext.render import render_variants
+from videopluxtext.smart_render import render_variants_partial
+
+logger = logging.getLogger(__name__)
+
+# Full-render backends share one interface and can be picked per job
+render_backends = {
+    "moviepy": render_variants,
+    "ffmpeg": render_variants_ffmpeg,
+}
+
+# "full" re-encodes the whole clip, "overlay-only" re-encodes just the GOPs an overlay touches
+render_modes = {
+    "full": render_variants,
+    "overlay-only": render_variants_partial,
+}
+
+
+try:
+    import resource
+except ImportError:
+    # Windows has no rlimits; the scheduler plans fewer workers instead
+    resource = None
+
+
+def _limit_worker_memory(memory_bytes):
+    # Hard cap on the worker's address space so one oversized job fails instead of taking the host down
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def _render_group(video_path, variants, fps, codec, audio_codec, threads, mode, backend, progress=None):
+    # Workers are reused across groups, so each group reports only its own stages back to the parent
+    tracer.reset()
+    with span("render.group"):
+        if mode == "full":
+            render_backends[backend](
+                video_path, variants, fps=fps, codec=codec, audio_codec=audio_codec, threads=threads, progress=progress
+            )
+        else:
+            # Partial re-encodes keep the source frame rate so copied and re-encoded GOPs line up
+            render_modes[mode](
+                video_path, variants, codec=codec, audio_codec=audio_codec, threads=threads, progress=progress
+            )
+    return variants, tracer.snapshot()
+
+
+class RenderScheduler:
+    """Spread language-variant renders over a process pool within a CPU and memory budget."""
+
+    def __init__(self, core_budget=None, max_workers=None, memory_per_worker_mb=2048, enforce_memory_limit=False):
+        self.core_budget = core_budget or os.cpu_count() or 1
+        self.max_workers = max_workers or self.core_budget
+        self.memory_per_worker_mb = memory_per_worker_mb
+        self.enforce_memory_limit = enforce_memory_limit
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            core_budget=int(os.getenv("RENDER_CORE_BUDGET", "0")) or None,
+            max_workers=int(os.getenv("RENDER_MAX_WORKERS", "0")) or None,
+            memory_per_worker_mb=int(os.getenv("RENDER_MEMORY_PER_WORKER_MB", "2048")),
+            enforce_memory_limit=os.getenv("RENDER_ENFORCE_MEMORY_LIMIT", "0") == "1",
+        )
+
+    def plan(self, num_variants):
+        # Workers are bounded by jobs, configured maximum, cores and the memory we can actually spare
+        available_mb = psutil.virtual_memory().available // (1024 * 1024)
+        if self.enforce_memory_limit and resource is None:
+            # Nothing stops a worker outgrowing its share, so only plan on half of what is free
+            available_mb //= 2
+        memory_workers = max(1, available_mb // self.memory_per_worker_mb)
+        workers = max(1, min(num_variants, self.max_workers, self.core_budget, memory_workers))
+
+        # Whatever cores the workers leave over go to each encoder's own threads
+        threads = max(1, self.core_budget // workers)
+        return workers, threads
+
+    def run(
+        self, video_path, variants, fps=24, codec="libx264", audio_codec="aac", mode="full", backend="moviepy",
+        progress=None, frames_total=None,
+    ):
+        """Render every variant and yield each one as soon as its output file is written.
+
+        Each worker decodes the source once for its group of variants, and a group's
+        variants are all written by the same pass, so they are yielded together as soon
+        as that group finishes. ``progress`` must be picklable; each worker calls it as
+        ``progress(group, frames_done, frames_total)`` for its own group of variants. Given
+        an estimated ``frames_total`` per group, every group first reports
+        ``progress(group, 0, frames_total)``, so the overall total is known before any
+        worker starts.
+        """
+        if mode not in render_modes:
+            raise ValueError(f"Unknown render mode: {mode}")
+        if backend not in render_backends:
+            raise ValueError(f"Unknown render backend: {backend}")
+        if not variants:
+            return
+
+        workers, threads = self.plan(len(variants))
+
+        # Decoding cost scales with workers, not with the number of languages
+        groups = [variants[index::workers] for index in range(workers)]
+        if progress is not None and frames_total is not None:
+            for index in range(len(groups)):
+                progress(index, 0, frames_total)
+
+        initializer, initargs = None, ()
+        if self.enforce_memory_limit and resource is None:
+            logger.warning(
+                "Worker memory limits are not supported on this platform; running %d render worker(s) "
+                "without a hard cap", workers,
+            )
+        elif self.enforce_memory_limit:
+            initializer, initargs = _limit_worker_memory, (self.memory_per_worker_mb * 1024 * 1024,)
+
+        # Spawned workers do not inherit the Streamlit server's threads and locks
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=initializer, initargs=initargs
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _render_group, video_path, group, fps, codec, audio_codec, threads, mode, backend,
+                    partial(progress, index) if progress is not None else None,
+                )
+                for index, group in enumerate(groups)
+            ]
+            for future in as_completed(futures):
+                variants_done, stages = future.result()
+                tracer.merge(stages)
+                for variant in variants_done:
+                    yield variant
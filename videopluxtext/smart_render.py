@@ -0,0 +1,210 @@
+import os
+import shutil
+import tempfile
+
+from moviepy.editor import VideoFileClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+from tracing import count, span
+from videopluxtext.media import FFPROBE_BINARY, audio_output_args, probe_keyframes, probe_video, run_ffmpeg
+from videopluxtext.overlays import OverlayPlacement, composite_frame
+from videopluxtext.render import render_variants
+
+# libx264 profile names for the profiles ffprobe reports
+_x264_profiles = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+
+
+def plan_segments(keyframes, windows, duration):
+    """Split the timeline at keyframes and mark the GOPs that intersect an overlay window.
+
+    Returns ``(start, end, touched)`` tuples with neighbouring GOPs of the same kind merged.
+    """
+    boundaries = sorted(set(time for time in keyframes if 0 < time < duration))
+    boundaries = [0.0, *boundaries, duration]
+
+    segments = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        touched = any(window_start < end and start < window_end for window_start, window_end in windows)
+        if segments and segments[-1][2] == touched:
+            segments[-1] = (segments[-1][0], end, touched)
+        else:
+            segments.append((start, end, touched))
+    return segments
+
+
+# libx264 B-frame settings that give the frame reorder depth ffprobe reports as has_b_frames;
+# three B-frames with the default pyramid reorder two deep, like libx264's own defaults
+_x264_bframes = {0: 0, 1: 1}
+
+
+class _StreamMismatch(Exception):
+    pass
+
+
+def _encoder_params(info):
+    # Match the source stream so the re-encoded GOPs can be stream-copied next to the original ones
+    bframes = _x264_bframes.get(info["has_b_frames"] or 0, 3)
+    params = ["-pix_fmt", info["pix_fmt"] or "yuv420p", "-bf", str(bframes)]
+    profile = _x264_profiles.get(info["profile"])
+    if profile:
+        params += ["-profile:v", profile]
+    if info["level"] and info["level"] > 0:
+        params += ["-level", f"{info['level'] / 10:.1f}"]
+    return params
+
+
+def _stream_mismatch(source, segment):
+    # Parameters that have to agree for copied and re-encoded GOPs to decode as one stream
+    keys = ["codec", "width", "height", "pix_fmt", "has_b_frames"]
+    if source["level"] and source["level"] > 0:
+        keys.append("level")
+    mismatched = [key for key in keys if source[key] != segment[key]]
+    if _x264_profiles.get(source["profile"], source["profile"]) != _x264_profiles.get(
+        segment["profile"], segment["profile"]
+    ):
+        mismatched.append("profile")
+    return mismatched
+
+
+def _copy_segment(video_path, start, end, output_path):
+    run_ffmpeg([
+        "-ss", f"{start:.6f}",
+        "-i", video_path,
+        "-t", f"{end - start:.6f}",
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-bsf:v", "h264_mp4toannexb",
+        output_path,
+    ])
+
+
+def _encode_segment(video, placements, start, end, info, output_path, threads, on_frame=None):
+    fps = info["fps"]
+    writer = FFMPEG_VideoWriter(
+        output_path,
+        video.size,
+        fps,
+        codec="libx264",
+        threads=threads,
+        ffmpeg_params=_encoder_params(info),
+    )
+    try:
+        for index in range(int(round((end - start) * fps))):
+            t = start + index / fps
+            with span("render.decode"):
+                frame = video.get_frame(t)
+            with span("render.composite"):
+                composited = composite_frame(frame, placements, t)
+            with span("render.encode"):
+                writer.write_frame(composited)
+            if on_frame is not None:
+                on_frame()
+    finally:
+        writer.close()
+
+
+def render_variants_partial(video_path, variants, codec="libx264", audio_codec="aac", threads=None, progress=None):
+    """Re-encode only the GOPs that an overlay touches and stream-copy everything else.
+
+    Sources that libx264 cannot match (anything but H.264), or that cannot be probed for
+    keyframes because ffprobe is missing, fall back to a full render. So does a source
+    whose re-encoded GOPs come out with different stream parameters (profile, level,
+    pixel format, B-frame reordering), which the first re-encoded segment is checked
+    for. Audio is copied when MP4 can carry it and encoded with ``audio_codec``
+    otherwise. ``progress`` counts only the frames that are actually re-encoded.
+    """
+    info = probe_video(video_path)
+
+    def full_render():
+        return render_variants(
+            video_path, variants, fps=info["fps"] or 24, codec=codec, audio_codec=audio_codec, threads=threads,
+            progress=progress,
+        )
+
+    if info["codec"] != "h264" or codec != "libx264" or FFPROBE_BINARY is None:
+        return full_render()
+
+    # Packet times are absolute, while planning, get_frame and -ss all count from the stream's start
+    keyframes = [time - info["start_time"] for time in probe_keyframes(video_path)]
+    duration = info["duration"]
+    work_dir = tempfile.mkdtemp(prefix="smart_render_")
+    video = VideoFileClip(video_path)
+
+    try:
+        # Untouched GOP ranges are identical across variants, so each is copied once
+        copied = {}
+
+        # Plan every variant up front so progress knows how many frames will be re-encoded
+        plans = []
+        for variant in variants:
+            placements = [OverlayPlacement.from_overlay(overlay, video.size) for overlay in variant["overlays"]]
+            windows = [(placement.start, placement.end) for placement in placements]
+            plans.append((placements, plan_segments(keyframes, windows, duration)))
+        frames_total = sum(
+            int(round((end - start) * info["fps"])) for _, segments in plans for start, end, touched in segments if touched
+        )
+        frames_done = 0
+        checked = False
+
+        def on_frame():
+            nonlocal frames_done
+            frames_done += 1
+            progress(frames_done, frames_total)
+
+        for variant_index, (variant, (placements, segments)) in enumerate(zip(variants, plans)):
+            segment_paths = []
+            for segment_index, (start, end, touched) in enumerate(segments):
+                if touched:
+                    segment_path = os.path.join(work_dir, f"variant{variant_index}_{segment_index}.ts")
+                    _encode_segment(
+                        video, placements, start, end, info, segment_path, threads,
+                        on_frame=on_frame if progress is not None else None,
+                    )
+                    # Every segment is encoded with the same settings, so checking the first one is enough
+                    if not checked:
+                        mismatched = _stream_mismatch(info, probe_video(segment_path))
+                        if mismatched:
+                            raise _StreamMismatch(", ".join(mismatched))
+                        checked = True
+                elif (start, end) in copied:
+                    segment_path = copied[(start, end)]
+                else:
+                    segment_path = os.path.join(work_dir, f"copy_{len(copied)}.ts")
+                    with span("render.copy_segment"):
+                        _copy_segment(video_path, start, end, segment_path)
+                    copied[(start, end)] = segment_path
+                segment_paths.append(segment_path)
+
+            list_path = os.path.join(work_dir, f"variant{variant_index}.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for segment_path in segment_paths:
+                    f.write(f"file '{os.path.abspath(segment_path)}'\n")
+
+            # Concatenate the video segments and take the original audio, re-encoded only if MP4 cannot hold it
+            with span("render.concat"):
+                run_ffmpeg([
+                    "-f", "concat", "-safe", "0", "-i", list_path,
+                    "-i", video_path,
+                    "-map", "0:v:0", "-map", "1:a?",
+                    "-c:v", "copy",
+                    *audio_output_args(info, audio_codec),
+                    "-movflags", "+faststart",
+                    variant["output_path"],
+                ])
+    except _StreamMismatch:
+        # Stitching would produce a stream that breaks at the seams; re-encode everything instead
+        count("render.partial_fallback")
+        return full_render()
+    finally:
+        video.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return [variant["output_path"] for variant in variants]
@@ -1,54 +1,153 @@
-from transformers import AutoTokenizer, pipeline, AutoModel
-import torch
 from dotenv import load_dotenv
 import os
 from transformers.utils import logging
 from typing import Optional
 import asyncio
 
+from tracing import count, span
+from videopluxtext.model_registry import ModelRegistry, backends
+from videopluxtext.translation_cache import TranslationCache
+
 logging.set_verbosity_error()
 
 load_dotenv()
 
 class TranslateMassage:
 
-    def __init__(self):
+    def __init__(self, use_cache: Optional[bool] = None, backend: Optional[str] = None):
         self.model_name = "videopluxtext/cache/models--facebook--nllb-200-distilled-600M/snapshots/f8d333a098d19b4fd9a8b18f94170487ad3f821d"
-        self.model = AutoModel.from_pretrained(self.model_name)
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
         self.translator: Optional[object] = None
 
-    async def load_pipline(self):
-        self.translator = pipeline(
-            task="translation",
-            model="facebook/nllb-200-distilled-600M",
-            torch_dtype=torch.bfloat16,
+        # torch-fp32, torch-bf16, torch-int8 or onnx, see model_registry.backends
+        self.backend = backend or os.getenv("TRANSLATION_BACKEND", "torch-bf16")
+        if self.backend not in backends:
+            raise ValueError(f"Unknown translation backend: {self.backend}. Choose one of {', '.join(backends)}.")
+
+        # Translations are memoized per model snapshot and backend, so neither reuses another's output
+        if use_cache is None:
+            use_cache = os.getenv("TRANSLATION_CACHE", "1") != "0"
+        self.cache = TranslationCache(
+            db_path=os.getenv("TRANSLATION_CACHE_PATH", "videopluxtext/cache/translations.sqlite3"),
+            model_hash=f"{os.path.basename(self.model_name)}/{self.backend}",
+            memory_entries=int(os.getenv("TRANSLATION_CACHE_MEMORY_ENTRIES", "2048")),
+            disk_entries=int(os.getenv("TRANSLATION_CACHE_DISK_ENTRIES", "100000")),
+            enabled=use_cache,
         )
 
+    async def load_pipline(self):
+        # Loading blocks for a long time, so keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.ensure_loaded)
+
+    def ensure_loaded(self):
+        # Shared with every other TranslateMassage in the process, loaded from the local snapshot once
+        if self.translator is None:
+            with span("translate.model_load"):
+                self.translator = ModelRegistry.instance().get(self.model_name, self.backend)
+
+    def is_loaded(self):
+        return ModelRegistry.instance().is_loaded(self.model_name, self.backend)
+
+    def warm_up(self):
+        ModelRegistry.instance().warm_up(self.model_name, self.backend)
+
+    def model_stats(self):
+        return ModelRegistry.instance().stats(self.model_name, self.backend)
+
+    language_model = {
+        "English": "eng_Latn",
+        "Hindi": "hin_Deva",
+        "Bengali": "ben_Beng",
+        "Gujarati": "guj_Gujr",
+        "Marathi": "mar_Deva",
+        "Maithili": "mai_Deva",
+        "Malayalam": "mal_Mlym",
+        "Tamil": "tam_Taml",
+        "Telugu": "tel_Telu",
+    }
+
+    # Number of padded sequences sent through one generate call
+    batch_size = 8
+
+    source_language = "eng_Latn"
+
+    def is_cached(self, text, request_language):
+        targetModel = self.language_model.get(request_language)
+        return self.cache.contains(text, self.source_language, targetModel)
+
+    def cached_translation(self, text, request_language):
+        # Peeks at the cache without touching the model, for previews; None when it has not been translated yet
+        if not self.is_cached(text, request_language):
+            return None
+        return self.cache.get(text, self.source_language, self.language_model.get(request_language))
+
     def translate_input(self, text, request_language):
-        language_model = {
-            "English": "eng_Latn",
-            "Hindi": "hin_Deva",
-            "Bengali": "ben_Beng",
-            "Gujarati": "guj_Gujr",
-            "Marathi": "mar_Deva",
-            "Maithili": "mai_Deva",
-            "Malayalam": "mal_Mlym",
-            "Tamil": "tam_Taml",
-            "Telugu": "tel_Telu",
-        }
-
-        targetModel = language_model.get(request_language)
+        targetModel = self.language_model.get(request_language)
+
+        cached = self.cache.get(text, self.source_language, targetModel)
+        if cached is not None:
+            count("translate.cache_hits")
+            return [{"translation_text": cached}]
 
         if self.translator is None:
             raise ValueError("Translator pipeline has not been initialized. Call load_pipline first.")
 
-        text_translated = self.translator(
-            text, src_lang="eng_Latn", tgt_lang=targetModel
-        )
+        count("translate.cache_misses")
+        with span("translate.generate"):
+            text_translated = self.translator(
+                text, src_lang=self.source_language, tgt_lang=targetModel
+            )
+        self.cache.put(text, self.source_language, targetModel, text_translated[0].get("translation_text"))
 
         return text_translated
 
+    def translate_batch(self, texts, target_languages, batch_size=None):
+        if len(texts) != len(target_languages):
+            raise ValueError("texts and target_languages must have the same length.")
+
+        batch_size = batch_size or self.batch_size
+
+        # Group unique source strings by target language, remembering where each result goes
+        groups = {}
+        for position, (text, request_language) in enumerate(zip(texts, target_languages)):
+            positions = groups.setdefault(request_language, {})
+            positions.setdefault(text, []).append(position)
+
+        results = [None] * len(texts)
+        for request_language, positions in groups.items():
+            targetModel = self.language_model.get(request_language)
+
+            # Serve what we can from the cache and only send the misses to the model
+            unique_texts = []
+            for text in positions:
+                cached = self.cache.get(text, self.source_language, targetModel)
+                if cached is None:
+                    unique_texts.append(text)
+                else:
+                    count("translate.cache_hits")
+                    for position in positions[text]:
+                        results[position] = cached
+
+            if not unique_texts:
+                continue
+
+            if self.translator is None:
+                raise ValueError("Translator pipeline has not been initialized. Call load_pipline first.")
+
+            # The pipeline pads each chunk of batch_size texts into one generate call
+            count("translate.cache_misses", len(unique_texts))
+            with span("translate.generate"):
+                outputs = self.translator(
+                    unique_texts, src_lang=self.source_language, tgt_lang=targetModel, batch_size=batch_size
+                )
+
+            for text, output in zip(unique_texts, outputs):
+                translation = (output[0] if isinstance(output, list) else output).get("translation_text")
+                self.cache.put(text, self.source_language, targetModel, translation)
+                for position in positions[text]:
+                    results[position] = translation
+
+        return results
+
 
 if __name__ == "__main__":
     async def main():
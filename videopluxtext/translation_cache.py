@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TranslationCache:
+    """Two-level translation memo: an in-process LRU in front of a SQLite store."""
+
+    def __init__(self, db_path, model_hash, memory_entries=2048, disk_entries=100000, enabled=True):
+        self.db_path = db_path
+        self.model_hash = model_hash
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+        if self.enabled:
+            self._connect()
+
+    def _connect(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Streamlit runs scripts on different threads, so all access goes through self._lock
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                source_text TEXT NOT NULL,
+                src_lang TEXT NOT NULL,
+                tgt_lang TEXT NOT NULL,
+                model_hash TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source_text, src_lang, tgt_lang, model_hash)
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)"
+        )
+        self._connection.commit()
+
+    def get(self, text, src_lang, tgt_lang):
+        if not self.enabled:
+            return None
+
+        key = (text, src_lang, tgt_lang, self.model_hash)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            row = self._connection.execute(
+                "SELECT translation FROM translations "
+                "WHERE source_text = ? AND src_lang = ? AND tgt_lang = ? AND model_hash = ?",
+                key,
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE translations SET last_used = ? "
+                "WHERE source_text = ? AND src_lang = ? AND tgt_lang = ? AND model_hash = ?",
+                (time.time(), *key),
+            )
+            self._connection.commit()
+            self._remember(key, row[0])
+            self.hits += 1
+            self.disk_hits += 1
+            return row[0]
+
+    def contains(self, text, src_lang, tgt_lang):
+        # Lookup that leaves the hit/miss counters and LRU order alone
+        if not self.enabled:
+            return False
+
+        key = (text, src_lang, tgt_lang, self.model_hash)
+        with self._lock:
+            if key in self._memory:
+                return True
+            row = self._connection.execute(
+                "SELECT 1 FROM translations "
+                "WHERE source_text = ? AND src_lang = ? AND tgt_lang = ? AND model_hash = ?",
+                key,
+            ).fetchone()
+            return row is not None
+
+    def put(self, text, src_lang, tgt_lang, translation):
+        if not self.enabled:
+            return
+
+        key = (text, src_lang, tgt_lang, self.model_hash)
+        with self._lock:
+            self._remember(key, translation)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO translations "
+                "(source_text, src_lang, tgt_lang, model_hash, translation, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, translation, time.time()),
+            )
+            self._evict_disk()
+            self._connection.commit()
+
+    def _remember(self, key, translation):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        count = self._connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = count - self.disk_entries
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM translations WHERE rowid IN "
+                "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM translations")
+                self._connection.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Request:
+    __slots__ = ("text", "language", "future", "enqueued")
+
+    def __init__(self, text, language, future):
+        self.text = text
+        self.language = language
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class TranslationService:
+    """Asyncio front end for TranslateMassage that micro-batches concurrent requests.
+
+    Callers ``await translate(text, language)``. A background loop drains the queue,
+    waits at most ``max_wait_ms`` for more requests to join, and sends up to
+    ``max_batch_size`` of them through one ``translate_batch`` call on a dedicated
+    executor thread, so the event loop is never blocked by the model. A request's
+    timeout starts once the model is loaded, so a cold start never times it out.
+    """
+
+    def __init__(self, translator, max_batch_size=32, max_wait_ms=5, max_queue_size=256, request_timeout=120.0):
+        self.translator = translator
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.request_timeout = request_timeout
+
+        self._queue = None
+        self._loop = None
+        self._worker = None
+        self._model_load = None
+        # One generate call at a time; torch already spreads each call over every core
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation")
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+        self.total_queue_seconds = 0.0
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _wait_for_model(self, text, language):
+        # The cold load can take longer than any sensible timeout, so it is waited out before the clock starts
+        if self.translator.is_loaded():
+            return
+        if await self._loop.run_in_executor(None, self.translator.is_cached, text, language):
+            return
+        load = self._model_load
+        if load is None:
+            load = self._model_load = self._loop.run_in_executor(None, self.translator.ensure_loaded)
+        try:
+            await asyncio.shield(load)
+        except Exception as error:
+            # The next request tries the load again instead of inheriting this failure forever
+            if self._model_load is load:
+                self._model_load = None
+            raise RuntimeError(f"Translation model failed to load: {error!r}") from error
+
+    async def translate(self, text, language, timeout=None):
+        await self.start()
+        await self._wait_for_model(text, language)
+        timeout = self.request_timeout if timeout is None else timeout
+        deadline = time.perf_counter() + timeout
+        future = self._loop.create_future()
+
+        # A full queue makes callers wait here, which is the backpressure, but never past their timeout
+        try:
+            await asyncio.wait_for(self._queue.put(_Request(text, language, future)), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+        self.requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(deadline - time.perf_counter(), 0))
+        except asyncio.TimeoutError:
+            # The batch loop skips requests whose future is already done
+            future.cancel()
+            self.timeouts += 1
+            raise
+
+    async def translate_many(self, texts, languages, timeout=None):
+        return await asyncio.gather(
+            *(self.translate(text, language, timeout=timeout) for text, language in zip(texts, languages))
+        )
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+
+        # Take whatever is already waiting, then give stragglers a short window to join
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+
+            now = time.perf_counter()
+            self.total_queue_seconds += sum(now - request.enqueued for request in batch)
+            self.batches += 1
+            self.batched_requests += len(batch)
+
+            try:
+                results = await self._loop.run_in_executor(
+                    self._executor,
+                    self._translate_batch,
+                    [request.text for request in batch],
+                    [request.language for request in batch],
+                )
+            except Exception as error:
+                # Model errors often carry no message, so say which batch failed and what it held
+                languages = ", ".join(sorted({request.language for request in batch}))
+                failure = RuntimeError(
+                    f"Translation batch {self.batches} ({len(batch)} request(s) into {languages}) failed: {error!r}"
+                )
+                failure.__cause__ = error
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(failure)
+                continue
+
+            for request, result in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(result)
+
+    def _translate_batch(self, texts, languages):
+        # Fully cached batches never touch the model, so it is only loaded on a real miss
+        if not all(self.translator.is_cached(text, language) for text, language in zip(texts, languages)):
+            self.translator.ensure_loaded()
+        return self.translator.translate_batch(texts, languages)
+
+    def metrics(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "mean_queue_ms": 1000 * self.total_queue_seconds / self.batched_requests if self.batched_requests else 0.0,
+            "timeouts": self.timeouts,
+        }
+
+
+class BackgroundTranslationService(TranslationService):
+    """TranslationService on its own event loop thread, for synchronous callers such as Streamlit scripts.
+
+    Every script run shares the one loop, so requests from concurrent sessions land in the same batches.
+    """
+
+    def __init__(self, translator, **kwargs):
+        super().__init__(translator, **kwargs)
+        self._thread_loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._thread_loop.run_forever, name="translation-service", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._thread_loop).result()
+
+    def translate_many_blocking(self, texts, languages, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(
+            self.translate_many(texts, languages, timeout=timeout), self._thread_loop
+        )
+        return future.result()
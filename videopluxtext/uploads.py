@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+import time
+
+from tracing import span
+from videopluxtext.media import probe_video
+
+
+class UploadManager:
+    """Spools each distinct upload to disk once and memoizes its header metadata.
+
+    Uploads are keyed by the SHA-256 of their content. Every Streamlit session that
+    is looking at an upload holds a reference to it, and the spooled file is removed
+    as soon as the last reference is released. A reference not renewed by ``acquire``
+    for ``max_age_seconds`` counts as released, since a closed tab never releases.
+    Stale spools are swept at most once every ``cleanup_interval`` seconds,
+    piggybacking on ``spool`` and ``acquire``.
+    """
+
+    def __init__(self, root="temp_video/uploads", max_age_seconds=24 * 3600, cleanup_interval=15 * 60):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = float("-inf")
+        self._lock = threading.Lock()
+        self._paths = {}
+        self._metadata = {}
+        # digest -> {owner: last time the owner acquired it}
+        self._owners = {}
+        self._digests_by_file_id = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _maybe_cleanup(self):
+        # A long-running server never restarts, so the sweep rides along with normal traffic
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = now
+        self.cleanup()
+
+    def spool(self, uploaded_file):
+        self._maybe_cleanup()
+        # Hashing a large upload is not free, so remember the digest per Streamlit file id
+        file_id = getattr(uploaded_file, "file_id", None)
+        with self._lock:
+            digest = self._digests_by_file_id.get(file_id) if file_id else None
+
+        buffer = uploaded_file.getbuffer()
+        if digest is None:
+            with span("upload.hash"):
+                digest = hashlib.sha256(buffer).hexdigest()
+
+        extension = os.path.splitext(uploaded_file.name)[1].lower() or ".mp4"
+        path = os.path.join(self.root, digest + extension)
+
+        with self._lock:
+            if file_id:
+                self._digests_by_file_id[file_id] = digest
+            if not os.path.exists(path):
+                # Write under a temporary name so a half-written spool is never picked up
+                partial_path = path + ".part"
+                with span("upload.spool"), open(partial_path, "wb") as f:
+                    f.write(buffer)
+                os.replace(partial_path, path)
+            self._paths[digest] = path
+
+        return digest, path
+
+    def path(self, digest):
+        return self._paths[digest]
+
+    def metadata(self, digest):
+        with self._lock:
+            if digest in self._metadata:
+                return self._metadata[digest]
+            path = self._paths[digest]
+
+        with span("upload.probe"):
+            metadata = probe_video(path)
+        with self._lock:
+            self._metadata[digest] = metadata
+        return metadata
+
+    def acquire(self, digest, owner):
+        self._maybe_cleanup()
+        with self._lock:
+            self._owners.setdefault(digest, {})[owner] = time.time()
+
+    def release(self, digest, owner):
+        with self._lock:
+            owners = self._owners.get(digest, {})
+            owners.pop(owner, None)
+            if not owners:
+                self._remove(digest)
+
+    def _remove(self, digest):
+        path = self._paths.pop(digest, None)
+        self._metadata.pop(digest, None)
+        self._owners.pop(digest, None)
+        for file_id, file_digest in list(self._digests_by_file_id.items()):
+            if file_digest == digest:
+                del self._digests_by_file_id[file_id]
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def cleanup(self):
+        # Sessions that disappear without releasing (closed tabs, restarts) are caught by age
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            self._last_cleanup = time.monotonic()
+            for digest, owners in list(self._owners.items()):
+                for owner, last_seen in list(owners.items()):
+                    if last_seen < cutoff:
+                        del owners[owner]
+                if not owners:
+                    self._remove(digest)
+            referenced = {self._paths[digest] for digest in self._owners if digest in self._paths}
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if path in referenced or os.path.getmtime(path) >= cutoff:
+                    continue
+                digest = os.path.splitext(name)[0]
+                if digest in self._paths:
+                    self._remove(digest)
+                elif os.path.isfile(path):
+                    os.remove(path)